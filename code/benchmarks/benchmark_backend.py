@@ -0,0 +1,154 @@
+"""
+benchmark_backend.py
+
+Description:
+-------------
+Load test of the interactive webapp's /distribution endpoint. For each
+given version of code/interactive_webapp/backend.py, a uvicorn server is
+started in a subprocess, and N_CLIENTS threads send the same fixed,
+randomly drawn /distribution requests (two prediction dates of a contract,
+half of them with smallest_bin / largest_bin set) over keep-alive
+connections. The p50 and p99 latency, the throughput and the server's
+startup time are printed per version.
+
+A version is a git revision, whose backend modules are run from a
+temporary directory, or "worktree" for the files on disk. Servers run from
+code/interactive_webapp, so they read the same data files (and the same
+backend_snapshot, if there is one).
+
+Usage:
+------
+    python code/benchmarks/benchmark_backend.py [version ...]
+
+e.g. `benchmark_backend.py HEAD~1 worktree` to compare with the previous
+commit. Default: worktree.
+
+"""
+
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+
+WEBAPP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interactive_webapp')
+DATA_DIR = os.path.join(WEBAPP_DIR, '..', '..', 'data', 'daily_distribution_data')
+FILES = ['daily_distributions_fed_levels.csv', 'daily_distributions_headline_cpi_releases.csv',
+         'daily_distributions_unemployment_releases.csv']
+N_CLIENTS = 8
+N_REQUESTS = 2000
+
+
+def sample_requests(n, seed=0):
+    """n /distribution query strings over the contracts and dates in the data."""
+    rng = random.Random(seed)
+    df = pd.concat([pd.read_csv(os.path.join(DATA_DIR, f), usecols=['date', 'contract_preamble', 'strike'])
+                    for f in FILES])
+    dates = df.groupby('contract_preamble')['date'].unique()
+    strikes = df.groupby('contract_preamble')['strike'].unique()
+    contracts = list(dates.index)
+    queries = []
+    for _ in range(n):
+        contract = rng.choice(contracts)
+        params = [('contract_preamble', contract)] + [('prediction_dates', rng.choice(dates[contract]))
+                                                       for _ in range(2)]
+        if rng.random() < 0.5:
+            params += [('smallest_bin', rng.choice(strikes[contract])), ('largest_bin', rng.choice(strikes[contract]))]
+        queries.append('/distribution?' + urllib.parse.urlencode(params))
+    return queries
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_dir, port):
+    """Start uvicorn on port and return the process and seconds until it answered."""
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'backend:app', '--app-dir', app_dir,
+                               '--port', str(port), '--log-level', 'warning'], cwd=WEBAPP_DIR)
+    while True:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/types')
+            connection.getresponse().read()
+            return server, time.perf_counter() - start
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(f'server in {app_dir} exited with {server.returncode}')
+            time.sleep(0.05)
+
+
+def run_clients(port, queries):
+    """Send queries from N_CLIENTS threads; return the latencies in seconds and the wall time."""
+    latencies = [[] for _ in range(N_CLIENTS)]
+
+    def client(i):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        for query in queries[i::N_CLIENTS]:
+            start = time.perf_counter()
+            connection.request('GET', query)
+            response = connection.getresponse()
+            response.read()
+            latencies[i].append(time.perf_counter() - start)
+            if response.status != 200:
+                raise RuntimeError(f'{query}: HTTP {response.status}')
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(N_CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate(latencies), time.perf_counter() - start
+
+
+def backend_dir(version, tmp_dir):
+    """The directory holding the backend modules of a version."""
+    if version == 'worktree':
+        return WEBAPP_DIR
+    app_dir = os.path.join(tmp_dir, version.replace('/', '_').replace('~', '_'))
+    os.makedirs(app_dir)
+    files = subprocess.run(['git', 'ls-tree', '--name-only', version, './'], cwd=WEBAPP_DIR,
+                           check=True, capture_output=True, text=True).stdout.split()
+    for name in [name for name in files if name.endswith('.py')]:
+        source = subprocess.run(['git', 'show', f'{version}:code/interactive_webapp/{name}'], cwd=WEBAPP_DIR,
+                                check=True, capture_output=True).stdout
+        with open(os.path.join(app_dir, name), 'wb') as f:
+            f.write(source)
+    return app_dir
+
+
+def main():
+    versions = sys.argv[1:] or ['worktree']
+    queries = sample_requests(N_REQUESTS)
+    print(f'{N_REQUESTS} /distribution requests from {N_CLIENTS} concurrent clients')
+    print(f"{'version':<12} {'startup s':>9} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for version in versions:
+            port = free_port()
+            server, startup = start_server(backend_dir(version, tmp_dir), port)
+            try:
+                run_clients(port, queries[:100])  # warm up
+                latencies, wall = run_clients(port, queries)
+            finally:
+                server.terminate()
+                server.wait()
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f'{version:<12} {startup:9.2f} {p50:8.2f} {p99:8.2f} {len(queries) / wall:8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+benchmark_distribution_updates.py
+
+Description:
+-------------
+Simulates a nightly refresh for every series in distribution_engine.SERIES.
+In a temporary directory, the series' trades up to its last trading day
+are built into a distribution file. The last day's trades are then
+appended to the archive, as update_kalshi would, and the file is brought
+up to date two ways:
+
+    - full:        distribution_updates.rebuild_series, from every trade
+    - incremental: distribution_updates.update_series, from the new trades
+
+The two outputs must be byte-for-byte identical.
+
+Usage:
+------
+    python code/benchmarks/benchmark_distribution_updates.py [series ...]
+
+"""
+
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'convert_trades_to_pdfs'))
+
+from distribution_engine import SERIES, TRADE_DIR
+from distribution_updates import rebuild_series, update_series
+
+
+def main():
+    names = sys.argv[1:] or list(SERIES)
+    print(f"{'series':<26} {'new trades':>10} {'contracts':>9} {'full s':>7} {'incr s':>7}  output")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            config = SERIES[name]
+            trades = pd.read_csv(os.path.join(TRADE_DIR, config.trades), index_col=0)
+            date = pd.to_datetime(trades['created_time'], format='ISO8601').dt.date
+            last_day = date == date.max()
+
+            dirs = {label: os.path.join(tmp_dir, name, label) for label in ('full', 'incremental')}
+            for directory in dirs.values():
+                os.makedirs(directory)
+            archive = os.path.join(dirs['incremental'], config.trades)
+            trades[~last_day].to_csv(archive)
+            rebuild_series(name, dirs['incremental'], dirs['incremental'])
+
+            # the nightly update appends the last day's trades
+            trades[last_day].to_csv(archive, mode='a', header=False)
+            shutil.copy(archive, os.path.join(dirs['full'], config.trades))
+
+            start = time.perf_counter()
+            rebuild_series(name, dirs['full'], dirs['full'])
+            full_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            summary = update_series(name, dirs['incremental'], dirs['incremental'])
+            incremental_time = time.perf_counter() - start
+
+            same = filecmp.cmp(os.path.join(dirs['full'], config.distributions),
+                               os.path.join(dirs['incremental'], config.distributions), shallow=False)
+            print(f"{name:<26} {summary['new_trades']:>10} {summary['contracts']:>9} "
+                  f"{full_time:7.2f} {incremental_time:7.2f}  {'identical' if same else 'DIFFERENT'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+benchmark_distributions.py
+
+Description:
+-------------
+Rebuilds the daily distributions of every series in
+distribution_engine.SERIES from data/trade_level_data and reports, per
+series, the time to read the trades and to build the distributions. The
+result is compared with the file in data/daily_distribution_data: the
+(contract_preamble, date, strike) rows must match and the largest absolute
+difference in each numeric column is printed. Nothing is written.
+
+Usage:
+------
+    python code/benchmarks/benchmark_distributions.py [series ...]
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'convert_trades_to_pdfs'))
+
+from distribution_engine import SERIES, TRADE_DIR, DISTRIBUTION_DIR, build_distributions
+from trade_archive import read_trades
+
+
+KEYS = ['contract_preamble', 'date', 'strike']
+VALUES = ['yes_price', 'daily_volume', 'adjusted_yes_price', 'probability']
+
+
+def compare(new, filename):
+    """Rows only in one of the two frames, and the largest difference per column."""
+    old = pd.read_csv(filename, parse_dates=['date', 'expiry_date'], float_precision='round_trip')
+    merged = old.merge(new, on=KEYS, how='outer', suffixes=('_old', '_new'), indicator=True)
+    unmatched = int((merged['_merge'] != 'both').sum())
+    both = merged[merged['_merge'] == 'both']
+    diffs = {column: np.nanmax(np.abs(both[column + '_old'] - both[column + '_new']), initial=0)
+             for column in VALUES}
+    return unmatched, diffs
+
+
+def main():
+    names = sys.argv[1:] or list(SERIES)
+    print(f"{'series':<26} {'rows':>7} {'read s':>7} {'build s':>8}  {'unmatched':>9}  max abs diff")
+    total_build = 0.0
+    for name in names:
+        config = SERIES[name]
+
+        start = time.perf_counter()
+        trades = read_trades(os.path.join(TRADE_DIR, config.trades),
+                             columns=['ticker', 'count', 'created_time', 'yes_price'])
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df = build_distributions(trades, config)
+        build_time = time.perf_counter() - start
+        total_build += build_time
+
+        unmatched, diffs = compare(df, os.path.join(DISTRIBUTION_DIR, config.distributions))
+        worst = max(diffs.values())
+        print(f"{name:<26} {len(df):>7} {read_time:7.2f} {build_time:8.2f}  {unmatched:>9}  {worst:.2e}")
+    print(f"{'total':<26} {'':>7} {'':>7} {total_build:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+benchmark_http_session.py
+
+Description:
+-------------
+Compares pages/second when walking get_trades cursor chains against a local
+stub server, first with a fresh connection per request (the old module-level
+requests.get behaviour) and then with KalshiHttpClient's pooled keep-alive
+session.
+
+The stub is run twice: over HTTPS with a self-signed certificate, like the
+real API, where every fresh connection pays for a TLS handshake, and over
+plain HTTP, where it only pays for the TCP connect. Both are on loopback,
+so neither includes the network round trips a handshake costs against
+the real host; the HTTPS numbers are a lower bound on what pooling saves.
+
+The built-in rate limiter is disabled for both runs so the numbers reflect
+connection handling and signing only.
+
+Usage:
+------
+    python code/benchmarks/benchmark_http_session.py
+
+"""
+
+import os
+import sys
+import time
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from clients_kalshi import KalshiHttpClient, Environment
+from stub_kalshi_server import start_stub_server, make_private_key
+
+
+N_TICKERS = 40
+PAGES_PER_TICKER = 5
+
+
+def walk_tickers(get_page, n_tickers):
+    """Walks every ticker's cursor chain with get_page and returns pages fetched."""
+    pages = 0
+    for i in range(n_tickers):
+        ticker = f'STUB-25JAN-T{i}'
+        trades = get_page(ticker, None)
+        pages += 1
+        cursor = trades.get('cursor')
+        while cursor:
+            trades = get_page(ticker, cursor)
+            pages += 1
+            cursor = trades.get('cursor')
+    return pages
+
+
+def run(label, get_page):
+    start = time.perf_counter()
+    pages = walk_tickers(get_page, N_TICKERS)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {pages:>5} pages in {elapsed:6.2f}s  ->  {pages / elapsed:8.1f} pages/s")
+
+
+def compare(tls, private_key):
+    """Runs both variants against a stub server, over HTTPS if tls."""
+    server, base_url = start_stub_server(pages_per_ticker=PAGES_PER_TICKER, tls=tls)
+    scheme = 'https' if tls else 'http'
+
+    client = KalshiHttpClient('benchmark-key', private_key, Environment.DEMO)
+    client.host = base_url
+    client.rate_limit = lambda method='GET': None
+    # trust the stub's self-signed certificate (trust_env off, or a
+    # REQUESTS_CA_BUNDLE in the environment would override session.verify)
+    verify = server.cert_path if tls else True
+    client.session.verify = verify
+    client.session.trust_env = False
+
+    path = client.markets_url + '/trades'
+
+    # before: a new TCP connection for every page, as with requests.get
+    def get_page_unpooled(ticker, cursor):
+        params = {'ticker': ticker} if cursor is None else {'ticker': ticker, 'cursor': cursor}
+        headers = client.request_headers('GET', path)
+        headers['Connection'] = 'close'
+        response = requests.get(base_url + path, headers=headers, params=params, verify=verify)
+        client.raise_if_bad_response(response)
+        return response.json()
+
+    # after: the client's pooled keep-alive session
+    def get_page_pooled(ticker, cursor):
+        return client.get_trades(ticker=ticker, cursor=cursor)
+
+    with client:
+        # one untimed page each, so that neither run pays for imports or warm-up
+        get_page_unpooled('STUB-25JAN-WARMUP', None)
+        get_page_pooled('STUB-25JAN-WARMUP', None)
+        run(f'{scheme}: fresh connection per page', get_page_unpooled)
+        run(f'{scheme}: pooled keep-alive session', get_page_pooled)
+
+    server.shutdown()
+    server.server_close()
+
+
+def main():
+    private_key = make_private_key()
+    compare(True, private_key)
+    compare(False, private_key)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+benchmark_moments.py
+
+Description:
+-------------
+Recomputes the moments of every entry of moments_engine.MOMENT_FILES from
+its distribution file and reports the time to read the distributions and
+to compute the moments. The result is compared with the moments file in the
+repo: the (date, contract_preamble, expiry_date) rows must match, and the
+share of values equal to the last bit and the largest absolute difference
+are printed per column. Nothing is written.
+
+Kurtoses can differ in their last bits, and medians where the cumulative
+probability comes within rounding error of exactly half (see
+moments_engine); those medians are counted as near ties. Any other
+difference beyond 1e-9 is reported as a failure.
+
+Usage:
+------
+    python code/benchmarks/benchmark_moments.py [name ...]
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'convert_trades_to_pdfs'))
+
+from moments_engine import (MOMENT_FILES, GROUP_COLUMNS, MOMENT_COLUMNS, compute_moments, distribution_matrices,
+                            read_distributions, row_sums)
+
+
+VALUES = MOMENT_COLUMNS[len(GROUP_COLUMNS):]
+TOLERANCE = 1e-9
+
+
+def near_ties(df, value_column):
+    """The groups of df whose cumulative probability comes within TOLERANCE of half the total."""
+    groups, values, probability, valid = distribution_matrices(df, value_column)
+    order = np.argsort(np.where(valid, values, np.inf), axis=1, kind='stable')
+    cumulative = np.cumsum(np.take_along_axis(probability, order, axis=1), axis=1)
+    total = row_sums(probability)[:, None]
+    return groups[(np.abs(cumulative - total / 2) <= TOLERANCE * total).any(axis=1)]
+
+
+def compare(new, filename, ties):
+    """
+    Rows only in one of the two frames, per column the share of equal values
+    and the largest difference, and the number of medians that differ at a
+    near tie.
+    """
+    old = pd.read_csv(filename, dtype={column: str for column in GROUP_COLUMNS}, float_precision='round_trip')
+    merged = old.merge(new, on=GROUP_COLUMNS, how='outer', suffixes=('_old', '_new'), indicator=True)
+    unmatched = int((merged['_merge'] != 'both').sum())
+    both = merged[merged['_merge'] == 'both']
+    tied = pd.MultiIndex.from_frame(both[GROUP_COLUMNS]).isin(pd.MultiIndex.from_frame(ties))
+    results = {}
+    for column in VALUES:
+        old_values, new_values = both[column + '_old'].to_numpy(), both[column + '_new'].to_numpy()
+        diff = np.abs(old_values - new_values)
+        if column == 'median':
+            tie_diffs = int((diff[tied] > 0).sum())
+            diff = diff[~tied]
+        results[column] = ((old_values == new_values).mean() if len(both) else 1.0, np.nanmax(diff, initial=0))
+    return unmatched, results, tie_diffs
+
+
+def main():
+    names = sys.argv[1:] or list(MOMENT_FILES)
+    print(f"{'name':<26} {'rows':>6} {'read s':>7} {'moments s':>9}  {'unmatched':>9}  "
+          + '  '.join(f'{column:>14}' for column in VALUES) + '  near ties')
+    total_time, failed = 0.0, False
+    for name in names:
+        files = MOMENT_FILES[name]
+        value_column = 'strike' if files.kind == 'cdf' else 'midpoint'
+
+        start = time.perf_counter()
+        df = read_distributions(files.distributions, value_column)
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        moments = compute_moments(df, value_column)
+        if files.kind == 'pdf':
+            moments = moments.dropna()
+        moments_time = time.perf_counter() - start
+        total_time += read_time + moments_time
+
+        unmatched, results, tie_diffs = compare(moments, files.moments, near_ties(df, value_column))
+        failed |= unmatched > 0 or any(diff > TOLERANCE for _, diff in results.values())
+        print(f"{name:<26} {len(moments):>6} {read_time:7.3f} {moments_time:9.3f}  {unmatched:>9}  "
+              + '  '.join(f'{same:5.1%} {diff:8.1e}' for same, diff in results.values()) + f'  {tie_diffs:>9}')
+    print(f"{'total':<26} {'':>6} {total_time:17.3f}")
+    print('FAILED' if failed else f'all moments within {TOLERANCE:g} of the files in the repo')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+benchmark_page_accumulation.py
+
+Description:
+-------------
+Simulates a scrape of 500 pages x 1,000 trades and compares two ways of
+collecting the pages:
+
+    - concat: pd.concat onto the running results frame every page, as
+      scrape_kalshi used to do
+    - buffer: TradePageBuffer, materialised into one DataFrame at the end
+
+Each strategy runs in a fresh process so its peak RSS is measured on its
+own. Page generation is included in both timings.
+
+Usage:
+------
+    python code/benchmarks/benchmark_page_accumulation.py
+
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from trade_buffer import TradePageBuffer, TRADE_COLUMNS
+from stub_kalshi_server import make_trades
+
+
+N_PAGES = 500
+TRADES_PER_PAGE = 1000
+
+
+def accumulate_concat():
+    results = pd.DataFrame(columns=TRADE_COLUMNS)
+    for page in range(N_PAGES):
+        page_df = pd.DataFrame(make_trades('STUB-25JAN-T1.00', TRADES_PER_PAGE, page))
+        results = pd.concat([results, page_df], ignore_index=True)
+    return len(results)
+
+
+def accumulate_buffer():
+    results = TradePageBuffer()
+    for page in range(N_PAGES):
+        results.append_page(make_trades('STUB-25JAN-T1.00', TRADES_PER_PAGE, page))
+    return len(results.to_frame())
+
+
+def run(strategy, queue):
+    start = time.perf_counter()
+    rows = strategy()
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+    queue.put((rows, elapsed, peak_mb))
+
+
+def main():
+    print(f"{N_PAGES} pages x {TRADES_PER_PAGE} trades")
+    for label, strategy in [('concat', accumulate_concat), ('buffer', accumulate_buffer)]:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run, args=(strategy, queue))
+        process.start()
+        rows, elapsed, peak_mb = queue.get()
+        process.join()
+        print(f"{label:<8} {rows:>8} rows  {elapsed:7.2f}s  peak RSS {peak_mb:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
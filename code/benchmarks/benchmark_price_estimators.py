@@ -0,0 +1,81 @@
+"""
+benchmark_price_estimators.py
+
+Description:
+-------------
+Computes every estimator of price_estimators.ESTIMATORS per (ticker, day)
+for the trades of every series in distribution_engine.SERIES, twice:
+
+    - pandas: a DataFrame of the trades and one groupby per estimator
+    - kernel: price_estimators.aggregate_prices, one grouped pass over the
+      memory-mapped trade arrays
+
+and reports the time of each and the largest difference between the two.
+The array caches are built beforehand and not timed. Nothing is written.
+
+Usage:
+------
+    python code/benchmarks/benchmark_price_estimators.py [series ...]
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'convert_trades_to_pdfs'))
+
+from distribution_engine import SERIES, TRADE_DIR
+from price_estimators import ESTIMATORS, aggregate_prices
+from trade_arrays import open_trade_arrays
+
+
+def pandas_estimates(arrays):
+    """The estimators with one groupby each, as they would be written without the kernel."""
+    trades = arrays.to_frame()
+    trades['bucket'] = trades['created_time'].dt.tz_localize(None).dt.floor('1D')
+    trades['yes_price'] = trades['yes_price'].astype(float)
+    trades['count'] = trades['count'].astype(float)
+    trades['price_volume'] = trades['yes_price'] * trades['count']
+    keys = ['ticker', 'bucket']
+    by = trades.groupby(keys, observed=True, sort=True)
+
+    out = pd.DataFrame({'volume': by['count'].sum(), 'trades': by.size()})
+    out['vwap'] = by['price_volume'].sum() / out['volume']
+    out['last'] = by['yes_price'].last()
+    largest = trades.sort_values(keys + ['count'], kind='stable')
+    out['largest'] = largest.groupby(keys, observed=True)['yes_price'].last()
+    out['median'] = by['yes_price'].median()
+    for side in ['yes', 'no']:
+        taken = trades[trades['taker_side'] == side].groupby(keys, observed=True)
+        out[f'vwap_{side}_taker'] = taken['price_volume'].sum() / taken['count'].sum()
+    return out.reset_index()
+
+
+def main():
+    names = sys.argv[1:] or list(SERIES)
+    arrays = {name: open_trade_arrays(os.path.join(TRADE_DIR, SERIES[name].trades)) for name in names}
+    print(f"{'series':<26} {'trades':>8} {'buckets':>8} {'pandas s':>9} {'kernel s':>9} {'max abs diff':>13}")
+    totals = [0.0, 0.0]
+    for name in names:
+        start = time.perf_counter()
+        old = pandas_estimates(arrays[name])
+        pandas_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = aggregate_prices(arrays[name])
+        kernel_time = time.perf_counter() - start
+
+        diff = max(np.nanmax(np.abs(old[column].to_numpy() - new[column].to_numpy()), initial=0)
+                   for column in ['volume', 'trades'] + list(ESTIMATORS))
+        totals[0] += pandas_time
+        totals[1] += kernel_time
+        print(f"{name:<26} {len(arrays[name]):>8} {len(new):>8} {pandas_time:9.3f} {kernel_time:9.3f} {diff:13.1e}")
+    print(f"{'total':<26} {'':>8} {'':>8} {totals[0]:9.3f} {totals[1]:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
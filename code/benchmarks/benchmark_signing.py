@@ -0,0 +1,83 @@
+"""
+benchmark_signing.py
+
+Description:
+-------------
+Measures RSA-PSS signatures/second across key sizes for three cases:
+
+    - per-call: padding and hash objects rebuilt for every signature, as
+      KalshiBaseClient.sign_pss_text used to do
+    - RequestSigner: prepared padding/hash objects, one thread
+    - RequestSigner x N threads: the same signer shared by a thread pool,
+      as used by KalshiAsyncHttpClient when signing off the event loop
+
+Every message carries a distinct timestamp, as real requests do, so the
+numbers are pure signing cost.
+
+Usage:
+------
+    python code/benchmarks/benchmark_signing.py
+
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from clients_kalshi import RequestSigner
+from stub_kalshi_server import make_private_key
+
+
+KEY_SIZES = [1024, 2048, 3072, 4096]
+N_SIGNATURES = 400
+N_THREADS = 4
+
+
+def messages(n):
+    return [f"{1752000000000 + i}GET/trade-api/v2/markets/trades" for i in range(n)]
+
+
+def sign_per_call(private_key, text):
+    return private_key.sign(
+        text.encode('utf-8'),
+        padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.DIGEST_LENGTH
+        ),
+        hashes.SHA256()
+    )
+
+
+def rate(fn, msgs):
+    start = time.perf_counter()
+    fn(msgs)
+    return len(msgs) / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'key bits':>8} {'per-call':>12} {'signer':>12} {f'signer x{N_THREADS}':>12}  mean latency")
+    for key_size in KEY_SIZES:
+        private_key = make_private_key(key_size)
+        msgs = messages(N_SIGNATURES)
+
+        per_call = rate(lambda ms: [sign_per_call(private_key, m) for m in ms], msgs)
+
+        signer = RequestSigner(private_key)
+        single = rate(lambda ms: [signer.sign(m) for m in ms], msgs)
+
+        shared = RequestSigner(private_key)
+        with ThreadPoolExecutor(N_THREADS) as pool:
+            threaded = rate(lambda ms: list(pool.map(shared.sign, ms)), msgs)
+
+        latency_ms = 1000 * signer.stats()['mean_latency']
+        print(f"{key_size:>8} {per_call:>10.0f}/s {single:>10.0f}/s {threaded:>10.0f}/s  {latency_ms:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
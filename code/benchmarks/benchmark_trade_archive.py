@@ -0,0 +1,75 @@
+"""
+benchmark_trade_archive.py
+
+Description:
+-------------
+Converts every csv in data/trade_level_data to a Parquet trade archive in a
+temporary directory and compares, per file:
+
+    - size on disk
+    - full load time: pd.read_csv vs read_trades on the archive
+    - load time for the columns the distribution code needs
+      (ticker, created_time, yes_price, count)
+
+Load times are the best of 3 runs. The converted archives are deleted
+afterwards.
+
+Usage:
+------
+    python code/benchmarks/benchmark_trade_archive.py [data_dir]
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from trade_archive import convert_csv_to_archive, read_trades
+
+
+REPEATS = 3
+COLUMNS = ['ticker', 'created_time', 'yes_price', 'count']
+
+
+def best_time(load):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/trade_level_data'
+    names = sorted(name for name in os.listdir(data_dir) if name.endswith('.csv'))
+
+    print(f"{'file':<48} {'csv MB':>8} {'pq MB':>7} {'csv s':>7} {'pq s':>7} {'csv 4col':>9} {'pq 4col':>8}")
+    totals = [0.0] * 6
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            csv_filename = os.path.join(data_dir, name)
+            archive_filename = convert_csv_to_archive(
+                csv_filename, os.path.join(tmp_dir, os.path.splitext(name)[0] + '.parquet'))
+
+            row = [
+                os.path.getsize(csv_filename) / 1024 ** 2,
+                os.path.getsize(archive_filename) / 1024 ** 2,
+                best_time(lambda: pd.read_csv(csv_filename)),
+                best_time(lambda: read_trades(archive_filename)),
+                best_time(lambda: pd.read_csv(csv_filename, usecols=COLUMNS)),
+                best_time(lambda: read_trades(archive_filename, columns=COLUMNS)),
+            ]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(f"{name:<48} {row[0]:8.2f} {row[1]:7.2f} {row[2]:7.3f} {row[3]:7.3f} {row[4]:9.3f} {row[5]:8.3f}")
+
+    print(f"{'total':<48} {totals[0]:8.2f} {totals[1]:7.2f} {totals[2]:7.3f} {totals[3]:7.3f} {totals[4]:9.3f} {totals[5]:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+benchmark_trade_arrays.py
+
+Description:
+-------------
+Runs the same job in 4 fresh worker processes, each loading all archived
+trades and computing a volume-weighted price per ticker, using three
+loaders:
+
+    - csv:    pd.read_csv of every trade_level_data csv
+    - parquet: read_trades of Parquet archives of the same files
+    - arrays: open_trade_arrays, memory-mapped .npy caches
+
+It reports load and compute time per worker, each worker's peak RSS and
+its private (anonymous) memory at the end. Pages of the memory-mapped
+caches are file-backed and shared between workers, so they do not count
+towards the latter. Memory is read from /proc, so this needs Linux.
+Archives and caches are built in a temporary directory beforehand and are
+not timed.
+
+Usage:
+------
+    python code/benchmarks/benchmark_trade_arrays.py [data_dir]
+
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from trade_archive import convert_csv_to_archive, read_trades
+from trade_arrays import open_trade_arrays
+
+
+N_WORKERS = 4
+
+
+def vwap_frame(trades):
+    weighted = trades['yes_price'].astype(float) * trades['count']
+    return (weighted.groupby(trades['ticker']).sum() / trades.groupby('ticker')['count'].sum()).size
+
+
+def job_csv(filenames):
+    return sum(vwap_frame(pd.read_csv(f['csv'])) for f in filenames)
+
+
+def job_parquet(filenames):
+    return sum(vwap_frame(read_trades(f['parquet'])) for f in filenames)
+
+
+def job_arrays(filenames):
+    n = 0
+    for f in filenames:
+        arrays = open_trade_arrays(f['parquet'], f['arrays'])
+        weighted = np.add.reduceat(arrays.yes_price * arrays.count.astype(np.float64), arrays.offsets[:-1])
+        volume = np.add.reduceat(arrays.count.astype(np.float64), arrays.offsets[:-1])
+        n += len(weighted / volume)
+    return n
+
+
+def memory_mb():
+    """Peak RSS and current anonymous RSS of this process, in MB."""
+    # ru_maxrss survives exec, so it would report the parent's peak
+    status = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            status[key] = value.split()
+    return int(status['VmHWM'][0]) / 1024, int(status['RssAnon'][0]) / 1024
+
+
+def run(job, filenames):
+    start = time.perf_counter()
+    tickers = job(filenames)
+    elapsed = time.perf_counter() - start
+    return (tickers, elapsed) + memory_mb()
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/trade_level_data'
+    names = sorted(name for name in os.listdir(data_dir) if name.endswith('.csv'))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filenames = []
+        for name in names:
+            stem = os.path.join(tmp_dir, os.path.splitext(name)[0])
+            archive = convert_csv_to_archive(os.path.join(data_dir, name), stem + '.parquet')
+            open_trade_arrays(archive, stem + '.arrays')
+            filenames.append({'csv': os.path.join(data_dir, name), 'parquet': archive, 'arrays': stem + '.arrays'})
+
+        context = multiprocessing.get_context('spawn')
+        print(f"{N_WORKERS} workers, {len(names)} files")
+        for label, job in [('csv', job_csv), ('parquet', job_parquet), ('arrays', job_arrays)]:
+            with context.Pool(N_WORKERS) as pool:
+                results = pool.starmap(run, [(job, filenames)] * N_WORKERS)
+            tickers = results[0][0]
+            elapsed = max(r[1] for r in results)
+            peak_mb = max(r[2] for r in results)
+            anon_mb = max(r[3] for r in results)
+            print(f"{label:<8} {tickers:>5} tickers  {elapsed:7.3f}s  peak RSS {peak_mb:6.1f} MB  "
+                  f"private {anon_mb:6.1f} MB  (per worker)")
+
+
+if __name__ == '__main__':
+    main()
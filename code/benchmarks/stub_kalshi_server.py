@@ -0,0 +1,134 @@
+"""
+stub_kalshi_server.py
+
+Description:
+-------------
+A local stand-in for the Kalshi trades endpoint used by the benchmarks in
+this folder. It answers GET /trade-api/v2/markets/trades with pages of
+synthetic trades and a cursor, so a scraper can walk a full cursor chain
+without touching the real API or needing credentials.
+
+The server speaks HTTP/1.1, so clients that keep connections alive can
+reuse them across pages. With tls=True it serves HTTPS with a throwaway
+self-signed certificate, so that a new connection pays for a TLS
+handshake as it does against the real API.
+
+"""
+
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+
+def make_trades(ticker, n, page):
+    """Builds n synthetic trades for a ticker in the Kalshi response format."""
+    return [
+        {
+            'trade_id': str(uuid.uuid4()),
+            'ticker': ticker,
+            'count': 1 + (i % 50),
+            'created_time': f'2025-07-{1 + page % 28:02d}T12:{i % 60:02d}:00.000000Z',
+            'yes_price': 1 + (i % 98),
+            'no_price': 99 - (i % 98),
+            'taker_side': 'yes' if i % 2 else 'no',
+        }
+        for i in range(n)
+    ]
+
+
+class StubKalshiHandler(BaseHTTPRequestHandler):
+    """Serves pages_per_ticker pages of trades_per_page trades for any ticker."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    pages_per_ticker = 5
+    trades_per_page = 100
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        ticker = params.get('ticker', ['STUB-25JAN-T1.00'])[0]
+        page = int(params.get('cursor', ['0'])[0] or 0)
+
+        next_page = page + 1
+        body = json.dumps({
+            'trades': make_trades(ticker, self.trades_per_page, page),
+            'cursor': str(next_page) if next_page < self.pages_per_ticker else '',
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_self_signed_cert(directory):
+    """Writes a self-signed certificate for 127.0.0.1 and its key; returns their paths."""
+    key = make_private_key()
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]),
+                       critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, 'stub_cert.pem')
+    key_path = os.path.join(directory, 'stub_key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def start_stub_server(pages_per_ticker=5, trades_per_page=100, tls=False):
+    """
+    Starts the stub server on a free local port and returns (server,
+    base_url). With tls=True the server speaks HTTPS, and server.cert_path
+    is the certificate for clients to verify it with.
+    """
+    handler = type('Handler', (StubKalshiHandler,), {
+        'pages_per_ticker': pages_per_ticker,
+        'trades_per_page': trades_per_page,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.cert_path = None
+    if tls:
+        server.cert_dir = tempfile.TemporaryDirectory()
+        server.cert_path, key_path = write_self_signed_cert(server.cert_dir.name)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(server.cert_path, key_path)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    scheme = 'https' if tls else 'http'
+    return server, f'{scheme}://127.0.0.1:{server.server_address[1]}'
+
+
+def make_private_key(key_size=2048):
+    """Generates a throwaway RSA key so clients can sign requests to the stub."""
+    return rsa.generate_private_key(public_exponent=65537, key_size=key_size)
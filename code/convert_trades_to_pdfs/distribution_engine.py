@@ -0,0 +1,459 @@
+#!/usr/bin/python
+
+"""
+This file turns trade-level Kalshi data into daily probability distributions.
+
+It is a vectorised Python port of convert_trade_level_data_cdfs.R and
+convert_trade_level_data_pdfs.R and writes the same
+data/daily_distribution_data files. Every step works on whole columns with
+sorts, grouped reductions and segment offsets instead of looping over
+contracts and days:
+
+    cdf series (strike ladders: "above X" contracts, e.g. FED-25DEC-T4.00)
+        - the daily price of each strike is the yes_price of that day's
+          largest trade, and the volume the day's total count
+        - days without trades carry the last price forward
+        - prices are made non-increasing in strike (adjusted_yes_price)
+        - the probability of each bin is the difference of neighbouring
+          adjusted prices, with a low bin below the lowest strike
+        - zero-probability gaps are pushed towards the middle of the
+          distribution, and days are normalised to 100
+
+    pdf series (bins: "between X and Y" contracts, e.g. KXGDPYEAR-25-B1.8)
+        - the daily price is the volume-weighted mean yes_price
+        - the probability of each bin is its price, normalised to 100
+
+Some quirks of the R scripts are kept on purpose so that the output matches
+the files already in the repo; they are marked "as in the R script" below.
+
+Usage:
+------
+    python code/convert_trades_to_pdfs/distribution_engine.py [series ...]
+
+rebuilds the distribution files of the given series (default: all of
+SERIES) from data/trade_level_data. Requires only NumPy and pandas; Parquet
+trade archives (see kalshi_scraping/trade_archive) are read as well if
+pyarrow is installed.
+
+"""
+
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from trade_archive import read_trades
+
+
+SeriesConfig = namedtuple('SeriesConfig', ['trades', 'distributions', 'kind', 'strike_int', 'days_before_horizon'])
+
+TRADE_DIR = 'data/trade_level_data'
+DISTRIBUTION_DIR = 'data/daily_distribution_data'
+
+# the series with distributions in the repo. fed_decisions and
+# recession_annual are not strike ladders, and payrolls has no settled
+# parameters yet.
+SERIES = {
+    'fed_levels': SeriesConfig('trade_level_data_fed_levels.csv', 'daily_distributions_fed_levels.csv',
+                               'cdf', 0.25, 180),
+    'headline_cpi_releases': SeriesConfig('trade_level_data_headline_cpi_releases.csv',
+                                          'daily_distributions_headline_cpi_releases.csv', 'cdf', 0.1, 30),
+    'core_cpi_releases': SeriesConfig('trade_level_data_core_cpi_releases.csv',
+                                      'daily_distributions_core_cpi_releases.csv', 'cdf', 0.1, 30),
+    'unemployment_releases': SeriesConfig('trade_level_data_unemployment.csv',
+                                          'daily_distributions_unemployment_releases.csv', 'cdf', 0.1, 30),
+    'headline_cpi_end_of_year': SeriesConfig('trade_level_data_headline_cpi_end_of_year.csv',
+                                             'daily_distributions_headline_cpi_end_of_year.csv', 'pdf', None, None),
+    'gdp_end_of_year': SeriesConfig('trade_level_data_gdp_end_of_year.csv',
+                                    'daily_distributions_gdp_end_of_year.csv', 'pdf', None, None),
+}
+
+CDF_COLUMNS = ['date', 'contract_preamble', 'strike', 'yes_price', 'daily_volume', 'expiry_date',
+               'adjusted_yes_price', 'probability', 'swapped']
+PDF_COLUMNS = ['date', 'contract_preamble', 'strike', 'yes_price', 'daily_volume', 'expiry_date',
+               'bin_low', 'bin_high', 'midpoint', 'adjusted_yes_price', 'probability']
+
+# top and bottom bins of the end-of-year CPI contracts are unreliable
+EXCLUDED_PDF_BINS = [('KXACPI-2025', 0.6), ('KXACPI-2025', 6), ('ACPI-22', 3), ('ACPI-22', 8.9),
+                     ('ACPI-23', 1), ('ACPI-23', 10), ('ACPI-24', 1.5)]
+
+
+def group_starts(*keys):
+    """Boolean mask of the first row of each run of equal keys (rows sorted by keys)."""
+    starts = np.zeros(len(keys[0]), dtype=bool)
+    if len(starts):
+        starts[0] = True
+        for key in keys:
+            starts[1:] |= key[1:] != key[:-1]
+    return starts
+
+
+def group_sums(values, starts, initial=None):
+    """
+    Sums of values over the runs beginning at starts, added left to right as
+    R's sum() does (np.add.reduceat sums long runs pairwise, which can differ
+    in the last bit), optionally continuing from initial totals. Step j adds
+    the j-th value of every run that is longer than j, so the work is one
+    pass over values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.diff(np.append(starts, len(values)))
+    total = np.zeros(len(starts)) if initial is None else np.array(initial, dtype=np.float64)
+    longest_first = np.argsort(-lengths, kind='stable')
+    ascending = np.sort(lengths)
+    for j in range(lengths.max() if len(starts) else 0):
+        runs = longest_first[:len(starts) - np.searchsorted(ascending, j, side='right')]
+        total[runs] += values[starts[runs] + j]
+    return total
+
+
+def group_cummax(values, starts):
+    """
+    Running maxima of values within the runs beginning at starts. The values
+    are replaced by their ranks, and each run's ranks are raised above those
+    of every run before it, so one np.maximum.accumulate over all rows never
+    carries a maximum from one run into the next.
+    """
+    unique, ranks = np.unique(values, return_inverse=True)
+    run = np.zeros(len(values), dtype=np.int64)
+    run[starts[1:]] = 1
+    offset = np.cumsum(run) * len(unique)
+    return unique[np.maximum.accumulate(ranks + offset) - offset]
+
+
+def parse_tickers(tickers, kind):
+    """contract_preamble and strike of each ticker (parsed once per unique ticker)."""
+    codes, unique = pd.factorize(tickers)
+    unique = pd.Series(unique, dtype=str)
+    if kind == 'cdf':
+        # FED-25DEC-T4.00 -> FED-25DEC, 4.00
+        preamble = unique.str.replace(r'-T\d+\.?\d*$', '', regex=True)
+        preamble = preamble.where(preamble != 'FED-22JULY', 'FED-22JUL')
+        strike = pd.to_numeric(unique.str.extract(r'(?<=-T)(\d+\.?\d*)')[0])
+    else:
+        # KXGDPYEAR-25-B1.8 -> KXGDPYEAR-25, 1.8
+        preamble = unique.str.extract(r'^(.*)(?=-[^-]*$)')[0]
+        strike = pd.to_numeric(unique.str.extract(r'([^-]+)$')[0].str.replace(r'^[A-Za-z]', '', regex=True))
+    return preamble.to_numpy()[codes], strike.to_numpy()[codes]
+
+
+def convert_to_daily(trades, kind, seed=None, bar=None):
+    """
+    One row per (contract_preamble, strike, date) with yes_price and
+    daily_volume, sorted by contract_preamble, strike and date.
+
+    Rows also carry what is needed to fold in more trades later: max_count
+    (cdf) or price_volume, the sum of yes_price * count (pdf). If seed holds
+    such rows from earlier trades, cells present in both are continued from
+    the seed as if its trades came first in the file.
+
+    bar, a pandas frequency such as '1h' or '5min', buckets trades into bars
+    of that length instead of days; date is then the start of each bar (UTC).
+    """
+    preamble, strike = parse_tickers(trades['ticker'], kind)
+    created = pd.to_datetime(trades['created_time'], utc=True, format='ISO8601').dt.tz_localize(None)
+    date = (created.dt.normalize() if bar is None else created.dt.floor(bar)).to_numpy()
+    price = trades['yes_price'].to_numpy(dtype=np.float64)
+    count = trades['count'].to_numpy(dtype=np.float64)
+
+    preamble_codes, preambles = pd.factorize(preamble, sort=True)
+    if kind == 'cdf':
+        # as in the R script, the day's price is last(yes_price, count): the
+        # price of the largest trade, ties going to the last in file order
+        order = np.lexsort((np.arange(len(price)), count, date, strike, preamble_codes))
+    else:
+        order = np.lexsort((np.arange(len(price)), date, strike, preamble_codes))
+    preamble_codes, strike, date = preamble_codes[order], strike[order], date[order]
+    price, count = price[order], count[order]
+
+    starts = np.flatnonzero(group_starts(preamble_codes, strike, date))
+    ends = np.append(starts[1:], len(order)) - 1
+    daily = pd.DataFrame({
+        'date': date[starts],
+        'contract_preamble': np.asarray(preambles)[preamble_codes[starts]],
+        'strike': strike[starts],
+    })
+
+    previous = None
+    if seed is not None:
+        previous = seed.set_index(['contract_preamble', 'strike', 'date']).reindex(
+            pd.MultiIndex.from_frame(daily[['contract_preamble', 'strike', 'date']]))
+    volume = group_sums(count, starts, None if previous is None else previous['daily_volume'].fillna(0))
+    if kind == 'cdf':
+        max_count = count[ends]
+        daily_price = price[ends]
+        if previous is not None:
+            earlier = (previous['max_count'] > max_count).to_numpy()
+            max_count = np.where(earlier, previous['max_count'], max_count)
+            daily_price = np.where(earlier, previous['yes_price'], daily_price)
+        daily['yes_price'] = daily_price
+        daily['daily_volume'] = volume
+        daily['max_count'] = max_count
+    else:
+        price_volume = group_sums(price * count, starts,
+                                  None if previous is None else previous['price_volume'].fillna(0))
+        daily['yes_price'] = price_volume / volume
+        daily['daily_volume'] = volume
+        daily['price_volume'] = price_volume
+    return daily
+
+
+def fill_dataless_days(daily, first_date=None, last_date=None):
+    """
+    Give every (contract_preamble, strike) a row for every date (by default,
+    every date in daily), carrying the last price forward with zero volume,
+    and drop the rows before a strike's first price and after its contract's
+    expiry (its last day with trades).
+    """
+    combos = daily[['contract_preamble', 'strike']].drop_duplicates().reset_index(drop=True)
+    if first_date is None:
+        first_date, last_date = daily['date'].min(), daily['date'].max()
+    dates = pd.date_range(first_date, last_date, freq='D').to_numpy()
+    n_dates = len(dates)
+
+    # grid rows are ordered by contract_preamble, strike, date like daily
+    combo_index = pd.MultiIndex.from_frame(combos).get_indexer(
+        pd.MultiIndex.from_frame(daily[['contract_preamble', 'strike']]))
+    date_index = ((daily['date'].to_numpy() - dates[0]) // np.timedelta64(1, 'D')).astype(np.int64)
+    cells = combo_index * n_dates + date_index
+
+    price = np.full(len(combos) * n_dates, np.nan)
+    volume = np.zeros(len(combos) * n_dates)
+    price[cells] = daily['yes_price'].to_numpy()
+    volume[cells] = daily['daily_volume'].to_numpy()
+
+    grid_preamble = np.repeat(combos['contract_preamble'].to_numpy(), n_dates)
+    grid_strike = np.repeat(combos['strike'].to_numpy(), n_dates)
+    grid_date = np.tile(dates, len(combos))
+
+    # expiry: each contract's last date with a price
+    expiry = daily.groupby('contract_preamble')['date'].max()
+    grid_expiry = expiry.reindex(grid_preamble).to_numpy()
+
+    # as in the R script, prices are carried forward within each strike
+    # across contracts (in contract_preamble order), not within a contract
+    by_strike = np.argsort(grid_strike, kind='stable')
+    filled = price[by_strike]
+    positions = np.where(np.isnan(filled), -1, np.arange(len(filled)))
+    positions = np.maximum.accumulate(positions)
+    strike_starts = group_starts(grid_strike[by_strike])
+    strike_start = np.flatnonzero(strike_starts)[np.cumsum(strike_starts) - 1]
+    filled = np.where(positions >= strike_start, filled[np.maximum(positions, 0)], np.nan)
+    price[by_strike] = filled
+
+    keep = ~np.isnan(price) & (grid_date <= grid_expiry)
+    return pd.DataFrame({
+        'date': grid_date[keep],
+        'contract_preamble': grid_preamble[keep],
+        'strike': grid_strike[keep],
+        'yes_price': price[keep],
+        'daily_volume': volume[keep],
+        'expiry_date': grid_expiry[keep],
+    })
+
+
+def months_before(dates, months):
+    """
+    dates minus a number of months, NaT where that day does not exist (as
+    lubridate's `date - months(n)` gives NA for e.g. 31 August - 6 months).
+    """
+    dates = pd.DatetimeIndex(dates)
+    total = dates.year * 12 + (dates.month - 1) - months
+    return pd.to_datetime(pd.DataFrame({'year': total // 12, 'month': total % 12 + 1, 'day': dates.day}),
+                          errors='coerce').to_numpy()
+
+
+def clean_data(df):
+    """
+    Keep the last 6 months before each contract's expiry and add
+    adjusted_yes_price, the running maximum of yes_price from the highest
+    strike down, so a lower strike is never cheaper than a higher one.
+    """
+    unique_expiry = np.unique(df['expiry_date'].to_numpy())
+    earliest = pd.Series(months_before(unique_expiry, 6), index=unique_expiry)
+    earliest = earliest.reindex(df['expiry_date'].to_numpy()).to_numpy()
+    # NaT compares False, so those contracts are dropped, as in the R script
+    df = df[df['date'].to_numpy() >= earliest]
+
+    # the running maximum runs over every (contract_preamble, date) at once
+    preamble_codes = pd.factorize(df['contract_preamble'], sort=True)[0]
+    date, strike = df['date'].to_numpy(), df['strike'].to_numpy()
+    order = np.lexsort((-strike, date, preamble_codes))
+    starts = np.flatnonzero(group_starts(preamble_codes[order], date[order]))
+    adjusted = np.empty(len(df))
+    adjusted[order] = group_cummax(df['yes_price'].to_numpy(dtype=np.float64)[order], starts)
+    df = df.assign(adjusted_yes_price=adjusted)
+    return df.iloc[np.lexsort((date, strike, preamble_codes))].reset_index(drop=True)
+
+
+def swap_probabilities(probability, adjusted, lengths):
+    """
+    Push zero-probability gaps towards the middle of each day's distribution.
+
+    probability and adjusted are (days, bins) arrays padded past each day's
+    lengths. One pass walks the bins left to right, as the R loop does: a bin
+    with adjusted price above 49 and no probability takes the probability of
+    the bin below it, and a bin priced below 49 with no probability takes the
+    one above it. Passes repeat until nothing moves. All days are walked in
+    lockstep, one bin position at a time. Returns the number of passes.
+    """
+    # the R loop only runs for days with more than 3 bins, over bins 2..n-1
+    active = lengths > 3
+    passes = 0
+    while active.any():
+        passes += 1
+        swapped = np.zeros(len(lengths), dtype=bool)
+        for i in range(1, probability.shape[1] - 1):
+            rows = active & (i < lengths - 1)
+            if not rows.any():
+                break
+            here = probability[:, i]
+            up = rows & (adjusted[:, i] > 49) & (here == 0) & (probability[:, i - 1] != 0)
+            probability[up, i] = probability[up, i - 1]
+            probability[up, i - 1] = 0
+            down = rows & ~up & (adjusted[:, i] < 49) & (probability[:, i] == 0) & (probability[:, i + 1] != 0)
+            probability[down, i] = probability[down, i + 1]
+            probability[down, i + 1] = 0
+            swapped |= up | down
+        active &= swapped
+    return passes
+
+
+def convert_to_probabilities(df, strike_int, days_before_horizon):
+    """
+    Turn a cdf series' adjusted prices into per-bin probabilities summing to
+    100 for every contract and day.
+    """
+    # a low bin strike_int below the lowest strike, for "not even the lowest"
+    low_bins = df.groupby(['contract_preamble', 'date'], sort=False).agg(
+        strike=('strike', 'min'), expiry_date=('expiry_date', 'first')).reset_index()
+    low_bins['strike'] -= strike_int
+    df = pd.concat([df, low_bins], ignore_index=True)
+    df = df.sort_values(['contract_preamble', 'date', 'strike'], kind='stable').reset_index(drop=True)
+
+    starts = group_starts(df['contract_preamble'].to_numpy(), df['date'].to_numpy())
+    group = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    lengths = np.diff(np.append(first, len(df)))
+    position = np.arange(len(df)) - first[group]
+    last = position == lengths[group] - 1
+
+    # lowest bin: 99 - next price, top bin: price - 1, others: price - next price
+    adjusted = df['adjusted_yes_price'].to_numpy()
+    next_adjusted = np.append(adjusted[1:], np.nan)
+    probability = np.where(position == 0, 99 - next_adjusted,
+                           np.where(last, adjusted - 1, adjusted - next_adjusted))
+
+    # swap in a (days, bins) matrix
+    matrix = np.zeros((len(first), lengths.max(initial=0)))
+    adjusted_matrix = np.full(matrix.shape, np.nan)
+    matrix[group, position] = probability
+    adjusted_matrix[group, position] = adjusted
+    swap_probabilities(matrix, adjusted_matrix, lengths)
+    probability = matrix[group, position]
+
+    # drop days where a single bin holds everything, then normalise to 100
+    full_days = np.zeros(len(first), dtype=bool)
+    np.logical_or.at(full_days, group, probability == 98)
+    total = np.bincount(group, weights=probability)
+    df['probability'] = probability * 100 / total[group]
+    df['swapped'] = False
+    df = df[~full_days[group]]
+
+    horizon = df['expiry_date'] - pd.Timedelta(days=days_before_horizon)
+    df = df[df['date'] >= horizon]
+    # as in the R script, the output ends up ordered by strike
+    return df.sort_values('strike', kind='stable')[CDF_COLUMNS].reset_index(drop=True)
+
+
+def add_bins(df):
+    """Drop the unreliable end bins and add bin_low, bin_high and midpoint."""
+    excluded = pd.MultiIndex.from_tuples(EXCLUDED_PDF_BINS)
+    keys = pd.MultiIndex.from_arrays([df['contract_preamble'], df['strike']])
+    df = df[~keys.isin(excluded)].copy()
+
+    # the 5.8 bin of KXACPI-2025 is listed as 5.75; other strikes are midpoints
+    odd = (df['contract_preamble'] == 'KXACPI-2025') & (df['strike'] == 5.75)
+    df['bin_low'] = np.where(odd, 5.6, df['strike'] - 0.2)
+    df['bin_high'] = np.where(odd, 6, df['strike'] + 0.2)
+    df['midpoint'] = np.where(odd, 5.8, df['strike'])
+    return df
+
+
+def normalise_prices(df):
+    """A pdf series' probabilities: each bin's price, normalised to 100 per day."""
+    df = df.sort_values(['contract_preamble', 'date', 'strike'], kind='stable')
+    starts = group_starts(df['contract_preamble'].to_numpy(), df['date'].to_numpy())
+    total = group_sums(df['yes_price'], np.flatnonzero(starts))
+    df['probability'] = df['yes_price'] * 100 / total[np.cumsum(starts) - 1]
+    # as in the R script, the output ends up ordered by strike
+    return df.sort_values('strike', kind='stable')[PDF_COLUMNS].reset_index(drop=True)
+
+
+def build_distributions(trades, config):
+    """Daily distributions of one series from a DataFrame of its trades."""
+    return distributions_from_daily(convert_to_daily(trades, config.kind), config)
+
+
+def distributions_from_daily(daily, config, first_date=None, last_date=None):
+    """Daily distributions from the output of convert_to_daily."""
+    return distributions_from_filled(fill_dataless_days(daily, first_date, last_date), config)
+
+
+def distributions_from_filled(df, config):
+    """Distributions from prices with no gaps (see fill_dataless_days)."""
+    if config.kind == 'pdf':
+        df = add_bins(df)
+    df = clean_data(df)
+    if config.kind == 'cdf':
+        return convert_to_probabilities(df, config.strike_int, config.days_before_horizon)
+    return normalise_prices(df)
+
+
+def format_r_csv(df):
+    """Format a DataFrame as R's write_csv does (NA, TRUE/FALSE, 11 not 11.0)."""
+    out = pd.DataFrame(index=df.index)
+    for column, values in df.items():
+        if pd.api.types.is_datetime64_any_dtype(values):
+            out[column] = values.dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_bool_dtype(values):
+            out[column] = np.where(values, 'TRUE', 'FALSE')
+        elif pd.api.types.is_float_dtype(values):
+            text = values.astype(str).str.replace(r'\.0$', '', regex=True)
+            # readr switches to scientific notation below 1e-3, with no
+            # padding in the exponent: 9.16e-4, not 0.000916 or 9.16e-04
+            small = (values.abs() < 1e-3) & (values != 0)
+            scientific = pd.Series([np.format_float_scientific(value, unique=True, trim='-', exp_digits=1)
+                                    for value in values[small]], index=values.index[small], dtype=object)
+            text = text.where(~small, scientific)
+            out[column] = text.where(values.notna(), 'NA')
+        else:
+            out[column] = values
+    return out
+
+
+def write_distributions(df, filename):
+    format_r_csv(df).to_csv(filename, index=False)
+
+
+def build_series(name, trade_dir=TRADE_DIR, output_dir=DISTRIBUTION_DIR):
+    """Rebuild one series' distribution file from its trades and return it."""
+    config = SERIES[name]
+    trades = read_trades(os.path.join(trade_dir, config.trades),
+                         columns=['ticker', 'count', 'created_time', 'yes_price'])
+    df = build_distributions(trades, config)
+    if output_dir is not None:
+        write_distributions(df, os.path.join(output_dir, config.distributions))
+    return df
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or SERIES:
+        start = time.perf_counter()
+        df = build_series(name)
+        print(f"{name:<26} {len(df):>7} rows  {time.perf_counter() - start:6.2f}s")
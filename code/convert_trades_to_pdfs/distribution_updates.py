@@ -0,0 +1,202 @@
+#!/usr/bin/python
+
+"""
+This file refreshes daily distribution files incrementally after an update.
+
+update_kalshi appends new trades to the end of a trade archive. Instead of
+rebuilding a series' distributions from every trade since 2022 (see
+distribution_engine), update_series():
+
+    - reads only the trades appended since the last build
+    - folds them into a cache of daily (contract_preamble, strike, date)
+      cells kept next to the distribution file ('<file>.daily.pkl'), so a
+      day that already had trades is continued rather than re-read
+    - recomputes the distributions of the contracts that received trades,
+      plus, for each of their strikes, the next contract listing that
+      strike, whose first days are filled forward from them (as in the R
+      script, prices carry over between contracts of the same strike)
+    - splices those contracts' rows into the existing file, leaving the
+      text of every other row untouched
+
+so the work grows with the contracts being traded, not with the archive.
+The result is identical to a full rebuild. The cache records how many trades
+of the archive it covers and the trade_id of the last one. If that trade is
+no longer in the same place (the archive was rewritten), if new trades go
+back before the first date of the cache, or if there is no cache yet, the
+series is rebuilt in full.
+
+Usage:
+------
+    python code/convert_trades_to_pdfs/distribution_updates.py [series ...]
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from distribution_engine import (SERIES, TRADE_DIR, DISTRIBUTION_DIR, convert_to_daily,
+                                 distributions_from_daily, format_r_csv, write_distributions)
+from trade_archive import read_trades, read_trades_after
+
+
+TRADE_COLUMNS = ['trade_id', 'ticker', 'count', 'created_time', 'yes_price']
+CELL_KEYS = ['contract_preamble', 'strike', 'date']
+
+
+def cache_filename(output_filename):
+    return output_filename + '.daily.pkl'
+
+
+def load_cache(output_filename):
+    path = cache_filename(output_filename)
+    if not os.path.exists(path) or not os.path.exists(output_filename):
+        return None
+    return pd.read_pickle(path)
+
+
+def save_cache(output_filename, daily, trades_read, last_trade_id):
+    cache = {'rows': trades_read, 'last_trade_id': last_trade_id, 'daily': daily}
+    tmp_path = cache_filename(output_filename) + '.tmp'
+    pd.to_pickle(cache, tmp_path)
+    os.replace(tmp_path, cache_filename(output_filename))
+
+
+def read_new_trades(archive_filename, cache):
+    """
+    The trades appended to the archive since the cache was saved, or None if
+    the archive no longer starts with the trades the cache covers.
+    """
+    # re-read the last cached trade to check it is still where it was
+    trades = read_trades_after(archive_filename, cache['rows'] - 1, columns=TRADE_COLUMNS)
+    if len(trades) == 0 or trades['trade_id'].iloc[0] != cache['last_trade_id']:
+        return None
+    return trades.iloc[1:]
+
+
+def patch_distributions(filename, preambles, recomputed):
+    """
+    Replace the rows of the given contracts in a distribution file with
+    recomputed. The other rows are kept as text, without being parsed or
+    formatted again, and merged with the new rows in the order
+    distribution_engine writes: by strike, then contract and date.
+    """
+    with open(filename) as f:
+        header = f.readline()
+        lines = np.array(f.read().splitlines(), dtype=object)
+    keys = pd.read_csv(filename, usecols=['date', 'contract_preamble', 'strike'],
+                       dtype={'date': str, 'contract_preamble': str}, float_precision='round_trip')
+    kept = ~keys['contract_preamble'].isin(preambles).to_numpy()
+
+    new_lines = np.array(format_r_csv(recomputed).to_csv(index=False, header=False).splitlines(), dtype=object)
+    new_keys = recomputed[['date', 'contract_preamble', 'strike']].assign(
+        date=recomputed['date'].dt.strftime('%Y-%m-%d'))
+    all_keys = pd.concat([keys[kept], new_keys], ignore_index=True)
+    all_lines = np.concatenate([lines[kept], new_lines])
+    order = np.lexsort((all_keys['date'].to_numpy(), all_keys['contract_preamble'].to_numpy(),
+                        all_keys['strike'].to_numpy()))
+
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        f.write(header)
+        f.write('\n'.join(all_lines[order]))
+        f.write('\n')
+    os.replace(tmp_filename, filename)
+
+
+def merge_cells(daily, new_cells):
+    """daily with the cells in new_cells replaced or added."""
+    replaced = pd.MultiIndex.from_frame(daily[CELL_KEYS]).isin(pd.MultiIndex.from_frame(new_cells[CELL_KEYS]))
+    merged = pd.concat([daily[~replaced], new_cells], ignore_index=True)
+    return merged.sort_values(CELL_KEYS, kind='stable').reset_index(drop=True)
+
+
+def dependent_preambles(daily, touched):
+    """
+    The touched contracts plus, for each of their strikes, the next contract
+    (in contract_preamble order) that lists the same strike.
+    """
+    combos = daily[['strike', 'contract_preamble']].drop_duplicates().sort_values(['strike', 'contract_preamble'])
+    following = combos.groupby('strike')['contract_preamble'].shift(-1)
+    dependents = following[combos['contract_preamble'].isin(touched)].dropna()
+    return set(touched) | set(dependents)
+
+
+def carry_in_cells(daily, preambles):
+    """
+    For every strike of the given contracts, the last cell of the previous
+    contract listing that strike, if that contract is not among them. These
+    are the prices the contracts' first days are filled forward from.
+    """
+    last_cells = daily.groupby(['strike', 'contract_preamble'], sort=True).tail(1)
+    last_cells = last_cells.sort_values(['strike', 'contract_preamble'], kind='stable')
+    previous = last_cells.groupby('strike')['contract_preamble'].shift(1)
+    wanted = last_cells['contract_preamble'].isin(preambles)
+    carry_from = pd.MultiIndex.from_arrays([last_cells['strike'][wanted], previous[wanted]])
+    keys = pd.MultiIndex.from_arrays([last_cells['strike'], last_cells['contract_preamble']])
+    return last_cells[keys.isin(carry_from) & ~last_cells['contract_preamble'].isin(preambles)]
+
+
+def rebuild_series(name, trade_dir=TRADE_DIR, output_dir=DISTRIBUTION_DIR):
+    """Rebuild one series in full and cache its daily cells."""
+    config = SERIES[name]
+    archive_filename = os.path.join(trade_dir, config.trades)
+    output_filename = os.path.join(output_dir, config.distributions)
+
+    trades = read_trades(archive_filename, columns=TRADE_COLUMNS)
+    daily = convert_to_daily(trades, config.kind)
+    df = distributions_from_daily(daily, config)
+    write_distributions(df, output_filename)
+    save_cache(output_filename, daily, len(trades), trades['trade_id'].iloc[-1])
+    return {'new_trades': len(trades), 'contracts': int(daily['contract_preamble'].nunique()),
+            'rows': len(df), 'full': True}
+
+
+def update_series(name, trade_dir=TRADE_DIR, output_dir=DISTRIBUTION_DIR):
+    """
+    Bring one series' distribution file up to date with its trade archive,
+    recomputing only the contracts affected by the trades appended since the
+    last build. Returns a summary of what was done.
+    """
+    config = SERIES[name]
+    archive_filename = os.path.join(trade_dir, config.trades)
+    output_filename = os.path.join(output_dir, config.distributions)
+
+    cache = load_cache(output_filename)
+    new_trades = None if cache is None else read_new_trades(archive_filename, cache)
+    if new_trades is None:
+        return rebuild_series(name, trade_dir, output_dir)
+    if len(new_trades) == 0:
+        return {'new_trades': 0, 'contracts': 0, 'rows': 0, 'full': False}
+
+    # fold the new trades into the daily cells, continuing any existing cells
+    new_cells = convert_to_daily(new_trades, config.kind, seed=cache['daily'])
+    if new_cells['date'].min() < cache['daily']['date'].min():
+        # every contract's grid would start earlier
+        return rebuild_series(name, trade_dir, output_dir)
+    daily = merge_cells(cache['daily'], new_cells)
+
+    # recompute the affected contracts over the same dates a full build uses
+    preambles = dependent_preambles(daily, new_cells['contract_preamble'].unique())
+    subset = pd.concat([daily[daily['contract_preamble'].isin(preambles)], carry_in_cells(daily, preambles)])
+    subset = subset.sort_values(CELL_KEYS, kind='stable').reset_index(drop=True)
+    recomputed = distributions_from_daily(subset, config, daily['date'].min(), daily['date'].max())
+    recomputed = recomputed[recomputed['contract_preamble'].isin(preambles)]
+
+    patch_distributions(output_filename, preambles, recomputed)
+    save_cache(output_filename, daily, cache['rows'] + len(new_trades), new_trades['trade_id'].iloc[-1])
+    return {'new_trades': len(new_trades), 'contracts': len(preambles), 'rows': len(recomputed), 'full': False}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or SERIES:
+        start = time.perf_counter()
+        summary = update_series(name)
+        how = 'rebuilt' if summary['full'] else 'updated'
+        print(f"{name:<26} {how}: {summary['new_trades']} new trades, {summary['contracts']} contracts, "
+              f"{summary['rows']} rows in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,182 @@
+#!/usr/bin/python
+
+"""
+This file builds intraday distributions and moments: the same snapshots as
+data/daily_distribution_data and data/daily_moments_data, taken every bar
+(e.g. every hour, or every 5 minutes) instead of every day.
+
+Trades are bucketed by flooring created_time to the bar
+(convert_to_daily(bar=...)), and the rest is the daily pipeline of
+distribution_engine and moments_engine. Two things differ from the daily
+files, so that the work stays proportional to the trades rather than to
+(bars x strikes):
+
+    - a contract has a snapshot at each bar in which it traded, not at
+      every bar of the calendar. Bars without trades would repeat the
+      snapshot before them.
+    - prices are carried forward within a contract only, not across
+      contracts listing the same strike as the daily R script does.
+
+The series are streamed one contract at a time from the memory-mapped
+trade arrays (see kalshi_scraping/trade_arrays), so only one contract's
+trades and snapshots are in memory at once, and each contract's rows are
+appended to the output files as they are done.
+
+Output goes to data/intraday_distribution_data:
+
+    intraday_distributions_<series>_<bar>.csv
+    intraday_moments_<series>_<bar>.csv
+
+with the columns of the daily files. date (the start of the bar) and
+expiry_date (the contract's last bar with trades) are UTC timestamps, and
+daily_volume is the volume of the bar.
+
+Usage:
+------
+    python code/convert_trades_to_pdfs/intraday_distributions.py [series ...] [--bar 1h]
+
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from distribution_engine import (SERIES, TRADE_DIR, convert_to_daily, distributions_from_filled, format_r_csv,
+                                 parse_tickers)
+from moments_engine import compute_moments
+from trade_arrays import open_trade_arrays
+
+
+INTRADAY_DIR = 'data/intraday_distribution_data'
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def intraday_filenames(name, bar, output_dir=INTRADAY_DIR):
+    """The distribution and moments files of one series and bar size."""
+    return (os.path.join(output_dir, f'intraday_distributions_{name}_{bar}.csv'),
+            os.path.join(output_dir, f'intraday_moments_{name}_{bar}.csv'))
+
+
+def contract_rows(arrays, kind):
+    """{contract_preamble: row indices of its trades in arrays}, in contract order."""
+    preambles, _ = parse_tickers(pd.Series(arrays.tickers), kind)
+    rows = {}
+    for i in pd.Series(preambles).dropna().sort_values(kind='stable').index:
+        rows.setdefault(preambles[i], []).append(np.arange(arrays.offsets[i], arrays.offsets[i + 1]))
+    return {preamble: np.concatenate(slices) for preamble, slices in rows.items()}
+
+
+def fill_quiet_bars(bars):
+    """
+    Give each strike of one contract a row at every bar in which the
+    contract traded, from the strike's first price on, carrying the last
+    price forward with zero volume. expiry_date is the contract's last bar.
+    """
+    dates = np.unique(bars['date'].to_numpy())
+    strikes, strike_index = np.unique(bars['strike'].to_numpy(), return_inverse=True)
+    n_dates = len(dates)
+    cells = strike_index * n_dates + np.searchsorted(dates, bars['date'].to_numpy())
+
+    price = np.full(len(strikes) * n_dates, np.nan)
+    volume = np.zeros(len(strikes) * n_dates)
+    price[cells] = bars['yes_price'].to_numpy()
+    volume[cells] = bars['daily_volume'].to_numpy()
+
+    # carry forward within each strike: rows are strike-major, so a strike
+    # starts at a multiple of n_dates
+    positions = np.maximum.accumulate(np.where(np.isnan(price), -1, np.arange(len(price))))
+    strike_start = np.arange(len(price)) // n_dates * n_dates
+    price = np.where(positions >= strike_start, price[np.maximum(positions, 0)], np.nan)
+
+    keep = ~np.isnan(price)
+    return pd.DataFrame({
+        'date': np.tile(dates, len(strikes))[keep],
+        'contract_preamble': bars['contract_preamble'].iloc[0],
+        'strike': np.repeat(strikes, n_dates)[keep],
+        'yes_price': price[keep],
+        'daily_volume': volume[keep],
+        'expiry_date': dates[-1],
+    })
+
+
+def intraday_contracts(name, bar, trade_dir=TRADE_DIR):
+    """
+    Yield (contract_preamble, distributions, moments) for each contract of a
+    series with trades, one contract at a time.
+    """
+    config = SERIES[name]
+    value_column = 'strike' if config.kind == 'cdf' else 'midpoint'
+    arrays = open_trade_arrays(os.path.join(trade_dir, config.trades))
+
+    for preamble, rows in contract_rows(arrays, config.kind).items():
+        bars = convert_to_daily(arrays.to_frame(rows), config.kind, bar=bar)
+        distributions = distributions_from_filled(fill_quiet_bars(bars), config)
+        if len(distributions) == 0:
+            continue
+        distributions = distributions.sort_values(['date', 'strike'], kind='stable').reset_index(drop=True)
+        moments = compute_moments(distributions, value_column)
+        if config.kind == 'pdf':
+            # as in the R script (na.omit)
+            moments = moments.dropna().reset_index(drop=True)
+        yield preamble, distributions, moments
+
+
+def format_timestamps(values):
+    """values as UTC timestamp text, formatting each distinct bar once."""
+    codes, unique = pd.factorize(values)
+    return pd.DatetimeIndex(unique).strftime(TIMESTAMP_FORMAT).to_numpy(dtype=object)[codes]
+
+
+def format_bars(df):
+    """format_r_csv, with date and expiry_date as UTC timestamps."""
+    df = df.assign(date=format_timestamps(df['date']), expiry_date=format_timestamps(df['expiry_date']))
+    return format_r_csv(df)
+
+
+def build_intraday(name, bar='1h', trade_dir=TRADE_DIR, output_dir=INTRADAY_DIR):
+    """
+    Write one series' intraday distribution and moments files for a bar
+    size, and return the number of contracts and rows written.
+    """
+    filenames = intraday_filenames(name, bar, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {'contracts': 0, 'distribution_rows': 0, 'moment_rows': 0}
+
+    # each contract is appended as it is done; the files replace the old
+    # ones only once every contract has been written
+    tmp_filenames = [filename + '.tmp' for filename in filenames]
+    with open(tmp_filenames[0], 'w') as distribution_file, open(tmp_filenames[1], 'w') as moments_file:
+        for _, distributions, moments in intraday_contracts(name, bar, trade_dir):
+            header = summary['contracts'] == 0
+            format_bars(distributions).to_csv(distribution_file, index=False, header=header)
+            format_bars(moments).to_csv(moments_file, index=False, header=header)
+            summary['contracts'] += 1
+            summary['distribution_rows'] += len(distributions)
+            summary['moment_rows'] += len(moments)
+    for tmp_filename, filename in zip(tmp_filenames, filenames):
+        os.replace(tmp_filename, filename)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build intraday distributions and moments from trade archives.')
+    parser.add_argument('series', nargs='*', default=list(SERIES), help=f'default: {" ".join(SERIES)}')
+    parser.add_argument('--bar', default='1h', help="bar size as a pandas frequency, e.g. 1h or 5min (default 1h)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.series if name not in SERIES]
+    if unknown:
+        parser.error(f'unknown series: {" ".join(unknown)}')
+
+    for name in args.series:
+        start = time.perf_counter()
+        summary = build_intraday(name, args.bar)
+        print(f"{name:<26} {summary['contracts']:>4} contracts {summary['distribution_rows']:>9} rows "
+              f"{summary['moment_rows']:>8} bars  {time.perf_counter() - start:6.2f}s")
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+
+"""
+This file computes the daily moments of the distributions in
+data/daily_distribution_data.
+
+It is a vectorised port of get_moments() in convert_trade_level_data_cdfs.R
+and convert_trade_level_data_pdfs.R and writes the same
+data/daily_moments_data files. Instead of summarising one (date, contract)
+distribution at a time, the whole distribution table is laid out as a
+(distributions, strikes) matrix of values and probabilities: row i holds
+the i-th (date, contract_preamble) distribution, padded with zero
+probability past its last strike. Every statistic is then a handful of
+operations over all rows at once:
+
+    mean        probability-weighted mean
+    median      weighted median without interpolation (matrixStats'
+                weightedMedian): the first strike where the cumulative
+                probability reaches half, or the mean of it and the next
+                strike if it is exactly half
+    mode        the strike with the highest probability, the first one on
+                ties (collapse's fmode(ties = 'first'))
+    skewness    (mean - median) / mean absolute deviation about the
+                median, with the median taken as the first strike where the
+                cumulative probability reaches 0.5 (weightedGMSkew)
+    kurtosis    weighted excess kurtosis, scaled by (1 - 1/n)^2 with n the
+                total probability (DescTools' Kurt, method 3)
+    variance    probability-weighted variance
+
+Sums are added strike by strike, left to right, as R's sum() does. The
+results match the R output within 1e-9, not exactly: mean, mode, skewness
+and variance are the same to the last bit, but some kurtoses differ in
+their last bits (by up to about 1e-14), and so may the medians of
+distributions whose cumulative probability comes within rounding error of
+exactly half, which the R output resolves either way.
+benchmark_moments.py checks this without writing anything.
+
+cdf series use the strike as the value of each bin; pdf series use the
+midpoint and, as in the R script, drop days with a missing moment.
+
+Usage:
+------
+    python code/convert_trades_to_pdfs/moments_engine.py [series ...]
+
+rewrites the moments files of the given series (default: all of
+MOMENT_FILES) from their distribution files. The files in the repo were
+written by the R scripts, so the first run shows changes to the last
+digits of some kurtoses (see above); later runs write the same files again.
+
+"""
+
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from distribution_engine import SERIES, DISTRIBUTION_DIR, format_r_csv
+
+
+MOMENTS_DIR = 'data/daily_moments_data'
+
+MomentFiles = namedtuple('MomentFiles', ['distributions', 'moments', 'kind'])
+
+# every series in SERIES, plus the fed levels computed by the first version
+# of the cdf script, kept at the top of the repo
+MOMENT_FILES = {name: MomentFiles(os.path.join(DISTRIBUTION_DIR, config.distributions),
+                                  os.path.join(MOMENTS_DIR, f'daily_moments_{name}.csv'), config.kind)
+                for name, config in SERIES.items()}
+MOMENT_FILES['kalshi_ffr'] = MomentFiles('kalshi_ffr_distributions.csv', 'kalshi_ffr_moments.csv', 'cdf')
+
+GROUP_COLUMNS = ['date', 'contract_preamble', 'expiry_date']
+MOMENT_COLUMNS = GROUP_COLUMNS + ['mean', 'median', 'mode', 'skewness', 'kurtosis', 'variance']
+
+
+def row_sums(matrix):
+    """Sums of each row, added left to right (np.sum adds pairwise)."""
+    return np.add.accumulate(matrix, axis=1)[:, -1]
+
+
+def first_true(mask):
+    """Column of the first True in each row of a boolean matrix."""
+    return np.argmax(mask, axis=1)
+
+
+def distribution_matrices(df, value_column):
+    """
+    The groups of df (one per date, contract_preamble and expiry_date, in
+    dplyr's sorted order) and (groups, strikes) matrices of value_column and
+    probability. Rows keep the order they have in df; padding has value 0,
+    probability 0 and valid False.
+    """
+    codes = [pd.factorize(df[column], sort=True)[0] for column in GROUP_COLUMNS]
+    order = np.lexsort(codes[::-1])
+    sorted_codes = [code[order] for code in codes]
+
+    starts = np.zeros(len(order), dtype=bool)
+    starts[:1] = True
+    for code in sorted_codes:
+        starts[1:] |= code[1:] != code[:-1]
+    group = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    position = np.arange(len(order)) - first[group]
+
+    shape = (len(first), position.max() + 1 if len(order) else 0)
+    values, probability = np.zeros(shape), np.zeros(shape)
+    valid = np.zeros(shape, dtype=bool)
+    values[group, position] = df[value_column].to_numpy(dtype=np.float64)[order]
+    probability[group, position] = df['probability'].to_numpy(dtype=np.float64)[order]
+    valid[group, position] = True
+
+    groups = df[GROUP_COLUMNS].iloc[order[first]].reset_index(drop=True)
+    return groups, values, probability, valid
+
+
+def weighted_median(values, probability, valid, total):
+    """
+    matrixStats' weightedMedian(interpolate = FALSE) of every row: strikes
+    with zero probability are ignored, and a tie at half the total is split
+    as the mean of the two strikes around it.
+    """
+    rows = np.arange(len(values))
+    order = np.argsort(np.where(valid, values, np.inf), axis=1, kind='stable')
+    values = np.take_along_axis(values, order, axis=1)
+    probability = np.take_along_axis(probability, order, axis=1)
+
+    cumulative = np.cumsum(probability, axis=1)
+    half = total / 2
+    k = first_true((cumulative >= half[:, None]) & (probability > 0))
+    columns = np.arange(values.shape[1])
+    following = first_true((columns > k[:, None]) & (probability > 0))
+    tie = cumulative[rows, k] == half
+    return np.where(tie, (values[rows, k] + values[rows, following]) / 2, values[rows, k])
+
+
+def gm_skewness(values, probability, valid):
+    """weightedGMSkew of every row: (mean - median) / mean absolute deviation about the median."""
+    rows = np.arange(len(values))
+    w = probability / row_sums(probability)[:, None]
+    mu = row_sums(w * values)
+
+    order = np.argsort(np.where(valid, values, np.inf), axis=1, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(w, order, axis=1), axis=1)
+    median = sorted_values[rows, first_true(cumulative >= 0.5)]
+
+    mad = row_sums(w * np.abs(values - median[:, None]))
+    return (mu - median) / mad
+
+
+def compute_moments(df, value_column='strike'):
+    """
+    Moments of every (date, contract_preamble) distribution in a
+    distribution table, one row per distribution.
+    """
+    groups, values, probability, valid = distribution_matrices(df, value_column)
+    rows = np.arange(len(groups))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = row_sums(probability)
+        mean = row_sums(probability * values) / total
+        deviation = values - mean[:, None]
+        # x^2 is x * x in R, and the kurtosis loop multiplies out the fourth power
+        second = row_sums(probability * deviation ** 2)
+        fourth = row_sums(probability * (deviation * deviation * deviation * deviation))
+        excess = (fourth / total) / (second / total) ** 2 - 3
+
+        moments = groups.assign(
+            mean=mean,
+            median=weighted_median(values, probability, valid, total),
+            mode=values[rows, np.argmax(np.where(valid, probability, -np.inf), axis=1)],
+            skewness=gm_skewness(values, probability, valid),
+            kurtosis=(excess + 3) * (1 - 1 / total) ** 2 - 3,
+            variance=second / total,
+        )
+    return moments[MOMENT_COLUMNS]
+
+
+def read_distributions(filename, value_column):
+    """The columns of a distribution file needed for its moments. Dates are kept as text."""
+    return pd.read_csv(filename, usecols=GROUP_COLUMNS + [value_column, 'probability'],
+                       dtype={'date': str, 'contract_preamble': str, 'expiry_date': str},
+                       float_precision='round_trip')
+
+
+def build_moments(name, output=True):
+    """Recompute one MOMENT_FILES entry's moments from its distribution file and return them."""
+    files = MOMENT_FILES[name]
+    value_column = 'strike' if files.kind == 'cdf' else 'midpoint'
+    moments = compute_moments(read_distributions(files.distributions, value_column), value_column)
+    if files.kind == 'pdf':
+        # as in the R script (na.omit)
+        moments = moments.dropna().reset_index(drop=True)
+    if output:
+        format_r_csv(moments).to_csv(files.moments, index=False)
+    return moments
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or MOMENT_FILES:
+        start = time.perf_counter()
+        moments = build_moments(name)
+        print(f"{name:<26} {len(moments):>7} rows  {time.perf_counter() - start:6.2f}s")
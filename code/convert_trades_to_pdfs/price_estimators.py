@@ -0,0 +1,189 @@
+#!/usr/bin/python
+
+"""
+This file computes several price estimators for every (ticker, bucket) of a
+trade archive in one grouped pass.
+
+The distribution files keep one yes_price per strike and day: the price of
+the day's largest trade for cdf series, the volume-weighted mean for pdf
+series. To compare those choices with others, aggregate_prices() buckets
+the trades of a memory-mapped archive (see kalshi_scraping/trade_arrays)
+and evaluates any of ESTIMATORS on the same grouping:
+
+    vwap            volume-weighted mean price
+    last            price of the last trade
+    largest         price of the largest trade, the last one on ties (the
+                    daily price of the cdf series, except that
+                    convert_to_daily breaks ties in the order of the trade
+                    file rather than of time)
+    median          median trade price, unweighted (the mean of the two
+                    middle prices for an even number of trades)
+    vwap_yes_taker  vwap of the trades where the taker bought yes
+    vwap_no_taker   vwap of the trades where the taker bought no
+
+The trade arrays are sorted by ticker and time, so every (ticker, bucket)
+is a contiguous run and the grouping is found with one scan, not a sort.
+Estimators receive a TradeGroups and share what it computes once: the run
+boundaries, grouped sums, and orders within runs. Adding an estimator is
+adding a function to ESTIMATORS.
+
+Usage:
+------
+    python code/convert_trades_to_pdfs/price_estimators.py [series ...] [--bar 1D] [--estimators ...]
+
+writes data/price_estimate_data/price_estimates_<series>_<bar>.csv for the
+given series (default: all of SERIES).
+
+"""
+
+import argparse
+import os
+import sys
+import time
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+
+from distribution_engine import SERIES, TRADE_DIR, format_r_csv, parse_tickers
+from trade_arrays import TAKER_SIDES, open_trade_arrays
+
+
+ESTIMATE_DIR = 'data/price_estimate_data'
+
+
+class TradeGroups:
+    """
+    The trades of a memory-mapped archive (optionally only the given rows,
+    which must keep the archive's order) grouped into runs of equal ticker
+    and bucket, where a bucket is created_time floored to bar.
+    """
+
+    def __init__(self, arrays, bar='1D', rows=slice(None)):
+        step = pd.Timedelta(bar).value
+        self.ticker_code = np.asarray(arrays.ticker_code[rows])
+        created_time = np.asarray(arrays.created_time[rows])
+        self.bucket = created_time - created_time % step
+        self.price = np.asarray(arrays.yes_price[rows], dtype=np.float64)
+        self.count = np.asarray(arrays.count[rows], dtype=np.float64)
+        self.taker_side = np.asarray(arrays.taker_side[rows])
+
+        starts = np.zeros(len(self.price), dtype=bool)
+        starts[:1] = True
+        starts[1:] = (self.ticker_code[1:] != self.ticker_code[:-1]) | (self.bucket[1:] != self.bucket[:-1])
+        self.starts = np.flatnonzero(starts)
+        self.ends = np.append(self.starts[1:], len(starts)) - 1
+        self.lengths = self.ends - self.starts + 1
+        self.group = np.cumsum(starts) - 1
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sum(self, values):
+        """Sum of values over each group."""
+        return np.add.reduceat(values, self.starts) if len(self) else np.zeros(0)
+
+    def last_by(self, key):
+        """Row of the last trade of each group after a stable sort by key within the group."""
+        order = np.lexsort((np.arange(len(key)), key, self.group))
+        return order[self.ends]
+
+    @cached_property
+    def volume(self):
+        return self.sum(self.count)
+
+    @cached_property
+    def price_volume(self):
+        return self.sum(self.price * self.count)
+
+    @cached_property
+    def sorted_prices(self):
+        """Prices sorted within each group."""
+        return self.price[np.lexsort((self.price, self.group))]
+
+    def side_vwap(self, side):
+        count = np.where(self.taker_side == TAKER_SIDES.index(side), self.count, 0)
+        with np.errstate(invalid='ignore'):
+            return self.sum(self.price * count) / self.sum(count)
+
+
+def vwap(groups):
+    return groups.price_volume / groups.volume
+
+
+def last_trade(groups):
+    return groups.price[groups.ends]
+
+
+def largest_trade(groups):
+    return groups.price[groups.last_by(groups.count)]
+
+
+def median_trade(groups):
+    prices = groups.sorted_prices
+    low = groups.starts + (groups.lengths - 1) // 2
+    high = groups.starts + groups.lengths // 2
+    return (prices[low] + prices[high]) / 2
+
+
+ESTIMATORS = {
+    'vwap': vwap,
+    'last': last_trade,
+    'largest': largest_trade,
+    'median': median_trade,
+    'vwap_yes_taker': lambda groups: groups.side_vwap('yes'),
+    'vwap_no_taker': lambda groups: groups.side_vwap('no'),
+}
+
+
+def aggregate_prices(arrays, bar='1D', estimators=tuple(ESTIMATORS), rows=slice(None)):
+    """
+    One row per (ticker, bucket) of arrays with its volume, number of trades
+    and a column per estimator.
+    """
+    groups = TradeGroups(arrays, bar, rows)
+    first = groups.starts
+    out = pd.DataFrame({
+        'ticker': pd.Categorical.from_codes(groups.ticker_code[first], arrays.tickers),
+        'bucket': pd.to_datetime(groups.bucket[first]),
+        'volume': groups.volume,
+        'trades': groups.lengths,
+    })
+    for name in estimators:
+        out[name] = ESTIMATORS[name](groups)
+    return out
+
+
+def build_estimates(name, bar='1D', estimators=tuple(ESTIMATORS), trade_dir=TRADE_DIR, output_dir=ESTIMATE_DIR):
+    """Estimates for one series' trades, with contract_preamble and strike, written to output_dir."""
+    config = SERIES[name]
+    arrays = open_trade_arrays(os.path.join(trade_dir, config.trades))
+    estimates = aggregate_prices(arrays, bar, estimators)
+    preamble, strike = parse_tickers(estimates['ticker'].astype(str), config.kind)
+    estimates.insert(1, 'contract_preamble', preamble)
+    estimates.insert(2, 'strike', strike)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        text = estimates.assign(bucket=estimates['bucket'].dt.strftime('%Y-%m-%dT%H:%M:%SZ'))
+        format_r_csv(text).to_csv(os.path.join(output_dir, f'price_estimates_{name}_{bar}.csv'), index=False)
+    return estimates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute price estimators per ticker and bucket.')
+    parser.add_argument('series', nargs='*', default=list(SERIES), help=f'default: {" ".join(SERIES)}')
+    parser.add_argument('--bar', default='1D', help='bucket size as a pandas frequency (default 1D)')
+    parser.add_argument('--estimators', nargs='+', choices=list(ESTIMATORS), default=list(ESTIMATORS))
+    args = parser.parse_args()
+
+    unknown = [name for name in args.series if name not in SERIES]
+    if unknown:
+        parser.error(f'unknown series: {" ".join(unknown)}')
+
+    for name in args.series:
+        start = time.perf_counter()
+        estimates = build_estimates(name, args.bar, args.estimators)
+        print(f"{name:<26} {len(estimates):>8} buckets  {time.perf_counter() - start:6.2f}s")
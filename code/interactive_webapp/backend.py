@@ -3,9 +3,12 @@
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from backend_data import load_backend_data
+
 app = FastAPI()
 
 app.add_middleware(
@@ -16,59 +19,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Constants
-DATA_DIR = '../../data/daily_distribution_data/'
-FILES = {
-    'fed_levels': 'daily_distributions_fed_levels.csv',
-    'headline_cpi_releases': 'daily_distributions_headline_cpi_releases.csv',
-    'unemployment_releases': 'daily_distributions_unemployment_releases.csv',
-    
-}
-HORIZON_MAP = {
-    'FED-25JUL': '2025-07-30',
-    'FED-25SEP': '2025-09-17',
-    'FED-25OCT': '2025-10-29',
-    'FED-25DEC': '2025-12-10',
-}
-
-
-def load_and_process_csv(file_path: str, data_type: str) -> pd.DataFrame:
-    df = pd.read_csv(file_path, parse_dates=['date', 'expiry_date'])
-    df['type'] = data_type
-    return df.rename(columns={'date': 'prediction_date', 'expiry_date': 'horizon_date'})
-
-
-def apply_horizon_override(df: pd.DataFrame) -> pd.DataFrame:
-    df['horizon_date'] = df.apply(
-        lambda row: pd.to_datetime(HORIZON_MAP[row['contract_preamble']])
-        if row['contract_preamble'] in HORIZON_MAP else row['horizon_date'],
-        axis=1
-    )
-    return df
-
-
-# Load and prepare all data
-kalshi_data = pd.concat([
-    apply_horizon_override(load_and_process_csv(f"{DATA_DIR}{FILES['fed_levels']}", 'fed_levels')),
-    load_and_process_csv(f"{DATA_DIR}{FILES['headline_cpi_releases']}", 'headline_cpi_releases'),
-    load_and_process_csv(f"{DATA_DIR}{FILES['unemployment_releases']}", 'unemployment_releases'),
-], ignore_index=True)
+# Load the prepared data (see backend_data) and its lookup tables
+data = load_backend_data()
+strikes, probabilities = data.strikes, data.probabilities
+distribution_index = data.distribution_index
+prediction_dates_by_contract = data.prediction_dates_by_contract
+contract_metadata = data.contract_metadata
+contract_lists = data.contract_lists
+type_horizons = data.type_horizons
+types = data.types
+
+
+def lump_tail(group: np.ndarray, strike: np.ndarray, probability: np.ndarray, bound: float, below: bool):
+    # rows are sorted by group, then strike. Lump the probability of each
+    # group's strikes below (or above) bound into a bin at bound: added to
+    # the group's bin at bound if it has one, a new bin otherwise (only if
+    # there is probability to lump). Works on all groups at once.
+    if len(group) == 0:
+        return group, strike, probability
+    beyond = strike < bound if below else strike > bound
+    lumps = np.bincount(group[beyond], weights=probability[beyond], minlength=group[-1] + 1)
+    lump_groups = np.flatnonzero(lumps > 0)
+    lumps = lumps[lump_groups]
+
+    group, strike, probability = group[~beyond], strike[~beyond], probability[~beyond].copy()
+    at_bound = np.flatnonzero(strike == bound)
+    existing = np.isin(lump_groups, group[at_bound])
+    rows = at_bound[np.searchsorted(group[at_bound], lump_groups[existing])]
+    probability[rows] += lumps[existing]
+
+    group = np.concatenate([group, lump_groups[~existing]])
+    strike = np.concatenate([strike, np.full((~existing).sum(), float(bound))])
+    probability = np.concatenate([probability, lumps[~existing]])
+    order = np.lexsort((strike, group))
+    return group[order], strike[order], probability[order]
 
 
 @app.get("/contracts")
 def get_contracts(type: Optional[str] = None):
-    df = kalshi_data
-    if type:
-        df = df[df["type"] == type]
-    contracts_sorted = (
-        df[["contract_preamble", "horizon_date"]]
-        .dropna()
-        .drop_duplicates()
-        .sort_values("horizon_date", ascending=False)
-        .contract_preamble
-        .tolist()
-    )
-    return {"contracts": contracts_sorted}
+    return {"contracts": contract_lists.get(type or None, [])}
 
 
 @app.get("/distribution")
@@ -78,79 +67,52 @@ def get_distribution(
     smallest_bin: Optional[float] = None,
     largest_bin: Optional[float] = None
 ):
-    df = kalshi_data[kalshi_data['contract_preamble'] == contract_preamble]
-    output = {}
+    metadata = contract_metadata.get(contract_preamble, {})
+    this_type = metadata.get('type')
+
+    # the rows of every requested date, group i holding prediction_dates[i]
+    found = {}
+    for i, date_str in enumerate(prediction_dates):
+        rows = distribution_index.get((this_type, contract_preamble, pd.to_datetime(date_str)))
+        if rows is not None:
+            found[i] = rows
+    group = np.repeat(np.array(list(found), dtype=np.int64), [rows.stop - rows.start for rows in found.values()])
+    strike = np.concatenate([strikes[rows] for rows in found.values()] + [np.zeros(0)])
+    probability = np.concatenate([probabilities[rows] for rows in found.values()] + [np.zeros(0)])
+
+    if smallest_bin is not None:
+        group, strike, probability = lump_tail(group, strike, probability, smallest_bin, below=True)
+    if largest_bin is not None:
+        group, strike, probability = lump_tail(group, strike, probability, largest_bin, below=False)
 
-    for date_str in prediction_dates:
-        d = pd.to_datetime(date_str)
-        subset = df[df['prediction_date'] == d][['strike', 'probability']].copy()
-
-        if subset.empty:
-            output[date_str] = []
-            continue
-
-        # Handle lower bound
-        if smallest_bin is not None:
-            lower = subset[subset['strike'] < smallest_bin]
-            lump = lower['probability'].sum()
-            subset = subset[subset['strike'] >= smallest_bin]
-            if lump > 0:
-                subset = pd.concat([
-                    pd.DataFrame([{'strike': smallest_bin, 'probability': lump}]),
-                    subset
-                ]) if smallest_bin not in subset['strike'].values else subset.assign(
-                    probability=lambda x: x.apply(
-                        lambda row: row['probability'] + lump if row['strike'] == smallest_bin else row['probability'],
-                        axis=1
-                    )
-                )
-
-        # Handle upper bound
-        if largest_bin is not None:
-            upper = subset[subset['strike'] > largest_bin]
-            lump = upper['probability'].sum()
-            subset = subset[subset['strike'] <= largest_bin]
-            if lump > 0:
-                subset = pd.concat([
-                    subset,
-                    pd.DataFrame([{'strike': largest_bin, 'probability': lump}])
-                ]) if largest_bin not in subset['strike'].values else subset.assign(
-                    probability=lambda x: x.apply(
-                        lambda row: row['probability'] + lump if row['strike'] == largest_bin else row['probability'],
-                        axis=1
-                    )
-                )
-
-        output[date_str] = subset.sort_values('strike').to_dict(orient='records')
-
-    strike_labels = sorted(kalshi_data[kalshi_data['contract_preamble'] == contract_preamble]['strike'].unique())
+    output = {}
+    bounds = np.searchsorted(group, np.arange(len(prediction_dates) + 1))
+    for i, date_str in enumerate(prediction_dates):
+        rows = slice(bounds[i], bounds[i + 1])
+        output[date_str] = [{'strike': s, 'probability': p}
+                            for s, p in zip(strike[rows].tolist(), probability[rows].tolist())]
 
     return {
-        "strike_labels": strike_labels,
+        "strike_labels": metadata.get('strike_labels', []),
         "data": output
     }
 
 
 @app.get("/contract-info")
 def get_contract_info(contract_preamble: str):
-    df = kalshi_data[kalshi_data['contract_preamble'] == contract_preamble]
-    if df.empty:
+    metadata = contract_metadata.get(contract_preamble)
+    if metadata is None:
         return {}
 
-    this_type = df['type'].iloc[0]
-    this_horizon = df['horizon_date'].iloc[0]
-    latest_pred = df['prediction_date'].max()
+    this_horizon = metadata['horizon_date']
+    latest_pred = metadata['latest_prediction_date']
 
     today = pd.to_datetime("today").normalize()
 
-    # Only horizons from same contract type
-    type_horizons = kalshi_data[kalshi_data['type'] == this_type][['contract_preamble', 'horizon_date']]
-    type_horizons = type_horizons.drop_duplicates().sort_values('horizon_date')
-
-    previous_horizons = type_horizons[type_horizons['horizon_date'] < this_horizon]
-    past_horizons = previous_horizons[previous_horizons['horizon_date'] < today]
-
-    previous_valid = past_horizons['horizon_date'].max() if not past_horizons.empty else None
+    # the latest horizon of the same contract type before this one that has passed
+    horizons = type_horizons[metadata['type']]
+    before = horizons.searchsorted(min(this_horizon, today))
+    previous_valid = horizons[before - 1] if before > 0 else None
 
     return {
         "horizon_date": this_horizon.date(),
@@ -160,16 +122,8 @@ def get_contract_info(contract_preamble: str):
 
 @app.get("/types")
 def get_types():
-    return {"types": kalshi_data["type"].dropna().unique().tolist()}
+    return {"types": types}
 
 @app.get("/prediction-dates")
 def get_prediction_dates(contract_preamble: str, type: str):
-    filtered = kalshi_data[
-        (kalshi_data["contract_preamble"] == contract_preamble) &
-        (kalshi_data["type"] == type)
-    ]
-    if filtered.empty:
-        return {"dates": []}
-
-    unique_dates = filtered["prediction_date"].dropna().dt.strftime('%Y-%m-%d').unique()
-    return {"dates": sorted(unique_dates)}
+    return {"dates": prediction_dates_by_contract.get((contract_preamble, type), [])}
@@ -0,0 +1,235 @@
+"""
+This file prepares the data the backend serves, and keeps a binary snapshot
+of it so that workers start without parsing the csv files.
+
+The prepared data is a handful of flat arrays: the strikes and
+probabilities of every distribution, sorted by type, contract and
+prediction date, the start of each (type, contract_preamble,
+prediction_date) in them, and per contract its type, horizon, latest
+prediction date and strikes. Contracts and types are stored as codes into
+lists of names, dates as int32 day numbers. The lookup tables of the
+endpoints (see BackendData) are built from these arrays, whether they come
+from the csv files or from the snapshot.
+
+    python backend_data.py
+
+(run from code/interactive_webapp, like the backend) writes the snapshot to
+SNAPSHOT_DIR: one .npy file per array and meta.json, which holds the names
+and the size and modification time of every source file. The backend
+memory-maps the arrays on startup. If a source file has changed since the
+snapshot was written, or there is no snapshot, it falls back to the csv
+files.
+
+The snapshot is not committed (a checkout gives every file a new
+modification time, which would make it stale anyway), so a deploy has to
+build it after fetching the code and data, or every worker takes the slow
+path. On Render, with code/interactive_webapp as the root directory, the
+build command is:
+
+    pip install -r requirements.txt && python backend_data.py
+
+with the start command unchanged. The backend prints a line when it falls
+back to the csv files, so a missing build step shows in the logs.
+
+"""
+
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Constants
+DATA_DIR = '../../data/daily_distribution_data/'
+FILES = {
+    'fed_levels': 'daily_distributions_fed_levels.csv',
+    'headline_cpi_releases': 'daily_distributions_headline_cpi_releases.csv',
+    'unemployment_releases': 'daily_distributions_unemployment_releases.csv',
+}
+# horizon dates to use instead of the last day with trades, per type and
+# contract (e.g. the FOMC meeting of contracts that are still trading)
+HORIZON_OVERRIDES_FILE = 'horizon_overrides.csv'
+SNAPSHOT_DIR = 'backend_snapshot'
+SNAPSHOT_VERSION = 1
+
+BackendData = namedtuple('BackendData', [
+    'strikes', 'probabilities', 'distribution_index', 'prediction_dates_by_contract',
+    'contract_metadata', 'contract_lists', 'type_horizons', 'types',
+])
+
+
+def load_and_process_csv(file_path: str, data_type: str) -> pd.DataFrame:
+    df = pd.read_csv(file_path, parse_dates=['date', 'expiry_date'])
+    df['type'] = data_type
+    return df.rename(columns={'date': 'prediction_date', 'expiry_date': 'horizon_date'})
+
+
+def apply_horizon_overrides(df: pd.DataFrame, overrides: pd.DataFrame) -> pd.DataFrame:
+    # look up every row's (type, contract_preamble) in the overrides at once
+    keys = pd.MultiIndex.from_frame(df[['type', 'contract_preamble']])
+    override = overrides.set_index(['type', 'contract_preamble'])['horizon_date'].reindex(keys).to_numpy()
+    df['horizon_date'] = np.where(pd.isna(override), df['horizon_date'].to_numpy(), override)
+    return df
+
+
+def load_kalshi_data() -> pd.DataFrame:
+    return apply_horizon_overrides(
+        pd.concat([load_and_process_csv(f"{DATA_DIR}{file}", data_type) for data_type, file in FILES.items()],
+                  ignore_index=True),
+        pd.read_csv(HORIZON_OVERRIDES_FILE, parse_dates=['horizon_date']),
+    )
+
+
+def day_numbers(dates) -> np.ndarray:
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int32)
+
+
+def build_contract_lists(df: pd.DataFrame) -> dict:
+    # the /contracts answer for every type, and for no type (None)
+    lists = {}
+    for data_type, rows in [(None, df)] + list(df.groupby('type')):
+        lists[data_type] = (
+            rows[["contract_preamble", "horizon_date"]]
+            .dropna()
+            .drop_duplicates()
+            .sort_values("horizon_date", ascending=False)
+            .contract_preamble
+            .tolist()
+        )
+    return lists
+
+
+def prepare_arrays(df: pd.DataFrame):
+    # the arrays and names described at the top of the file
+    types = df['type'].dropna().unique().tolist()
+    by_contract = df.groupby('contract_preamble', sort=False)
+    contracts = by_contract.agg(
+        type=('type', 'first'),
+        horizon_date=('horizon_date', 'first'),
+        latest_prediction_date=('prediction_date', 'max'),
+    )
+    contract_names = contracts.index.tolist()
+    labels = by_contract['strike'].unique().map(np.sort)
+    lists = build_contract_lists(df)
+
+    # sort so that each (type, contract_preamble, prediction_date) is one
+    # contiguous slice of the strike and probability arrays, in strike order
+    df = df.sort_values(['type', 'contract_preamble', 'prediction_date', 'strike'], kind='stable')
+    keys = df[['type', 'contract_preamble', 'prediction_date']]
+    starts = np.flatnonzero((keys != keys.shift()).any(axis=1).to_numpy())
+    keys = keys.iloc[starts]
+
+    contract_lists = [pd.Index(contract_names).get_indexer(lists.get(data_type, []))
+                      for data_type in [None] + types]
+
+    arrays = {
+        'strike': df['strike'].to_numpy(dtype=np.float64),
+        'probability': df['probability'].to_numpy(dtype=np.float64),
+        'key_type': pd.Index(types).get_indexer(keys['type']).astype(np.int8),
+        'key_contract': pd.Index(contract_names).get_indexer(keys['contract_preamble']).astype(np.int32),
+        'key_day': day_numbers(keys['prediction_date']),
+        'key_start': starts.astype(np.int64),
+        'contract_type': pd.Index(types).get_indexer(contracts['type']).astype(np.int8),
+        'contract_horizon_day': day_numbers(contracts['horizon_date']),
+        'contract_latest_day': day_numbers(contracts['latest_prediction_date']),
+        'strike_labels': np.concatenate(labels.tolist()).astype(np.float64),
+        'strike_label_offsets': np.cumsum([0] + labels.map(len).tolist()).astype(np.int64),
+        'contract_lists': np.concatenate(contract_lists).astype(np.int32),
+        'contract_list_offsets': np.cumsum([0] + [len(codes) for codes in contract_lists]).astype(np.int64),
+    }
+    return arrays, {'types': types, 'contracts': contract_names}
+
+
+def backend_data(arrays, names) -> BackendData:
+    # the lookup tables of the endpoints, from the output of prepare_arrays
+    types, contracts = names['types'], names['contracts']
+    type_names = np.array(types, dtype=object)
+    contract_names = np.array(contracts, dtype=object)
+
+    starts = arrays['key_start'].tolist()
+    stops = starts[1:] + [len(arrays['strike'])]
+    key_types = type_names[arrays['key_type']].tolist()
+    key_contracts = contract_names[arrays['key_contract']].tolist()
+    key_dates = pd.to_datetime(np.asarray(arrays['key_day'], dtype='datetime64[D]'))
+    key_text = np.datetime_as_string(np.asarray(arrays['key_day'], dtype='datetime64[D]')).tolist()
+
+    distribution_index = {}
+    prediction_dates_by_contract = {}
+    for data_type, contract, date, text, start, stop in zip(key_types, key_contracts, key_dates, key_text,
+                                                            starts, stops):
+        distribution_index[(data_type, contract, date)] = slice(start, stop)
+        prediction_dates_by_contract.setdefault((contract, data_type), []).append(text)
+
+    horizons = pd.to_datetime(np.asarray(arrays['contract_horizon_day'], dtype='datetime64[D]'))
+    latest = pd.to_datetime(np.asarray(arrays['contract_latest_day'], dtype='datetime64[D]'))
+    label_offsets = arrays['strike_label_offsets'].tolist()
+    contract_types = type_names[arrays['contract_type']].tolist()
+    contract_metadata = {
+        contract: {
+            'type': contract_types[i],
+            'horizon_date': horizons[i],
+            'latest_prediction_date': latest[i],
+            'strike_labels': arrays['strike_labels'][label_offsets[i]:label_offsets[i + 1]].tolist(),
+        }
+        for i, contract in enumerate(contracts)
+    }
+
+    list_offsets = arrays['contract_list_offsets'].tolist()
+    contract_lists = {
+        data_type: contract_names[arrays['contract_lists'][list_offsets[i]:list_offsets[i + 1]]].tolist()
+        for i, data_type in enumerate([None] + types)
+    }
+    type_horizons = {
+        data_type: pd.DatetimeIndex(np.unique(horizons[np.asarray(arrays['contract_type']) == i]))
+        for i, data_type in enumerate(types)
+    }
+    return BackendData(arrays['strike'], arrays['probability'], distribution_index, prediction_dates_by_contract,
+                       contract_metadata, contract_lists, type_horizons, types)
+
+
+def source_stamps() -> dict:
+    paths = [f"{DATA_DIR}{file}" for file in FILES.values()] + [HORIZON_OVERRIDES_FILE]
+    return {path: [os.stat(path).st_size, os.stat(path).st_mtime_ns] for path in paths}
+
+
+def write_snapshot(directory: str = SNAPSHOT_DIR):
+    arrays, names = prepare_arrays(load_kalshi_data())
+    os.makedirs(directory, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, name + '.npy'), values)
+
+    # meta.json goes last: a snapshot without it is incomplete and not used
+    meta = {'version': SNAPSHOT_VERSION, 'sources': source_stamps(), **names}
+    tmp_path = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+
+def read_snapshot(directory: str = SNAPSHOT_DIR):
+    # the arrays and names of the snapshot, or None if it is missing or stale
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != SNAPSHOT_VERSION or meta.get('sources') != source_stamps():
+        return None
+    arrays = {name[:-len('.npy')]: np.load(os.path.join(directory, name), mmap_mode='r')
+              for name in os.listdir(directory) if name.endswith('.npy')}
+    return arrays, meta
+
+
+def load_backend_data(directory: str = SNAPSHOT_DIR) -> BackendData:
+    snapshot = read_snapshot(directory)
+    if snapshot is None:
+        print(f"No up-to-date snapshot in {directory}, reading the csv files (run backend_data.py to write one)")
+        snapshot = prepare_arrays(load_kalshi_data())
+    return backend_data(*snapshot)
+
+
+if __name__ == '__main__':
+    write_snapshot()
+    print(f"Wrote {SNAPSHOT_DIR}")
@@ -0,0 +1,75 @@
+#!/usr/bin/python
+
+"""
+This file drives concurrent trade downloads with KalshiAsyncHttpClient.
+
+Each ticker's trades still come back as a chain of pages linked by cursors,
+so a single chain is walked one page at a time. What runs concurrently is
+the chains themselves: up to max_concurrency tickers are in flight at once,
+and the client's own rate limiter keeps the combined request rate in check.
+
+"""
+
+import asyncio
+
+
+async def fetch_ticker_trades(client, ticker, semaphore, on_ticker=None, cursor=None, **filters):
+    """
+    Walk the full cursor chain for one ticker and return its trades as a
+    list of dicts, starting from cursor if given (to pick up a partially
+    fetched ticker). filters are passed through to get_trades (e.g. min_ts).
+    If on_ticker is given, it is called as on_ticker(ticker, trades) once the
+    chain is complete and nothing is returned, so the trades can be written
+    out and released straight away.
+    """
+    async with semaphore:
+
+        print(f"Fetching: {ticker}")
+
+        trades = await client.get_trades(ticker=ticker, cursor=cursor, **filters)
+        ticker_trades = list(trades['trades'])
+        cursor = trades.get('cursor')
+
+        page = 1
+
+        # when we hit the end, cursor will turn null and we'll exit the loop
+        while cursor:
+            trades = await client.get_trades(ticker=ticker, cursor=cursor, **filters)
+            ticker_trades.extend(trades['trades'])
+            cursor = trades.get('cursor')
+            page += 1
+
+        print(f"  {ticker}: {page} pages, {len(ticker_trades)} rows")
+
+    if on_ticker is not None:
+        on_ticker(ticker, ticker_trades)
+        return None
+    return ticker_trades
+
+
+async def fetch_tickers_trades(client, tickers, max_concurrency=8, on_ticker=None,
+                               cursors=None, ticker_filters=None, **filters):
+    """
+    Fetch the trades for every ticker with at most max_concurrency cursor
+    chains in flight. Returns a dict of ticker -> list of trades, in the
+    same order as tickers. With on_ticker, each ticker's trades are handed
+    to on_ticker(ticker, trades) as soon as that ticker finishes instead,
+    and the returned dict maps every ticker to None. cursors optionally
+    maps tickers to the cursor their chain should start from, and
+    ticker_filters to extra get_trades filters for that ticker alone
+    (e.g. its own min_ts).
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    cursors = cursors or {}
+    ticker_filters = ticker_filters or {}
+
+    # duplicate tickers appear in some of the example lists; fetch each once
+    unique_tickers = list(dict.fromkeys(tickers))
+
+    results = await asyncio.gather(*[
+        fetch_ticker_trades(client, ticker, semaphore, on_ticker, cursors.get(ticker),
+                            **{**filters, **ticker_filters.get(ticker, {})})
+        for ticker in unique_tickers
+    ])
+
+    return dict(zip(unique_tickers, results))
@@ -5,25 +5,205 @@ Provides connection to the Kalshi API. File created from Kalshi tutorial team
 
 
 import requests
+import asyncio
 import base64
+import random
+import threading
 import time
 from typing import Any, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from enum import Enum
 import json
 
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from urllib3.util.retry import Retry
 
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.exceptions import InvalidSignature
 
+import aiohttp
 import websockets
 
+from rate_limiter import KalshiRateLimiter, TokenBucket
+
 class Environment(Enum):
     DEMO = "demo"
     PROD = "prod"
 
+class BackoffPolicy:
+    """Retry and rate-tuning policy shared by the HTTP clients.
+
+    Throttled (429) and transient server-error responses are retried after
+    the server's Retry-After delay when one is sent, and otherwise after a
+    jittered exponential backoff. The policy also tunes the rate limiter:
+    each 429 cuts the bucket's rate, and a run of fast successful responses
+    raises it back towards the configured rate.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "DELETE")
+
+    def __init__(
+        self,
+        max_retries: int = 8,
+        base_delay: float = 0.5,
+        max_delay: float = 60.0,
+        target_latency: float = 0.5,
+        decrease_factor: float = 0.5,
+        increase_step: float = 1.0,
+        healthy_streak: int = 20,
+        min_rate: float = 1.0,
+    ):
+        """Initializes the policy.
+
+        Args:
+            max_retries (int): Retries allowed per request before giving up.
+            base_delay (float): First backoff delay in seconds, doubled per retry.
+            max_delay (float): Cap on a single backoff delay without Retry-After.
+            target_latency (float): Responses faster than this count as healthy.
+            decrease_factor (float): Rate multiplier applied on each 429.
+            increase_step (float): Requests/second added after a healthy streak.
+            healthy_streak (int): Healthy responses needed before raising the rate.
+            min_rate (float): Floor for the tuned rate.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.healthy_streak = healthy_streak
+        self.min_rate = min_rate
+
+        self.lock = threading.Lock()
+        self.streak = 0
+        self.retries = 0
+        self.throttled = 0
+        self.time_backed_off = 0.0
+
+    def should_retry(self, method: str, status: int, attempt: int) -> bool:
+        """Whether a response with this status should be retried."""
+        if attempt >= self.max_retries or status not in self.RETRY_STATUSES:
+            return False
+        # a 429 was rejected before doing anything, so even POSTs are safe to resend
+        return status == 429 or method.upper() in self.IDEMPOTENT_METHODS
+
+    def retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number attempt (counting from 0)."""
+        delay = self.parse_retry_after(retry_after)
+        if delay is None:
+            # full jitter keeps many workers from retrying in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        with self.lock:
+            self.retries += 1
+            self.time_backed_off += delay
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Reads a Retry-After header given either in seconds or as an HTTP date."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def rate_change(self, bucket: TokenBucket, status: int, latency: float) -> Optional[float]:
+        """The rate the bucket should be set to after a response, or None to keep it."""
+        with self.lock:
+            if status == 429:
+                self.throttled += 1
+                self.streak = 0
+                return max(self.min_rate, bucket.rate * self.decrease_factor)
+            elif status < 300 and latency < self.target_latency:
+                self.streak += 1
+                if self.streak >= self.healthy_streak and bucket.rate < bucket.configured_rate:
+                    self.streak = 0
+                    return min(bucket.configured_rate, bucket.rate + self.increase_step)
+            else:
+                self.streak = 0
+        return None
+
+    def on_response(self, bucket: TokenBucket, status: int, latency: float) -> None:
+        """Tunes the bucket's rate from a response's status and latency."""
+        rate = self.rate_change(bucket, status, latency)
+        if rate is not None:
+            bucket.set_rate(rate)
+
+    async def on_response_async(self, bucket: TokenBucket, status: int, latency: float) -> None:
+        """on_response, without blocking the event loop on a file-backed bucket."""
+        rate = self.rate_change(bucket, status, latency)
+        if rate is not None:
+            await bucket.set_rate_async(rate)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the retry counters."""
+        with self.lock:
+            return {
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'time_backed_off': self.time_backed_off,
+            }
+
+class RequestSigner:
+    """RSA-PSS signer for Kalshi request messages.
+
+    The PSS padding and SHA-256 objects are built once and reused for every
+    signature, and the latency of every signature is recorded. Signatures
+    are not cached: the message includes a millisecond timestamp, so two
+    requests almost never sign the same text.
+    """
+    def __init__(self, private_key: rsa.RSAPrivateKey):
+        """Initializes the signer.
+
+        Args:
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+        """
+        self.private_key = private_key
+        self.algorithm = hashes.SHA256()
+        self.padding = padding.PSS(
+            mgf=padding.MGF1(self.algorithm),
+            salt_length=padding.PSS.DIGEST_LENGTH
+        )
+        self.lock = threading.Lock()
+
+        self.signatures = 0
+        self.sign_time = 0.0
+        self.max_latency = 0.0
+
+    def sign(self, text: str) -> str:
+        """Signs the text using RSA-PSS and returns the base64 encoded signature."""
+        started = time.perf_counter()
+        try:
+            signature = self.private_key.sign(text.encode('utf-8'), self.padding, self.algorithm)
+        except InvalidSignature as e:
+            raise ValueError("RSA sign PSS failed") from e
+        latency = time.perf_counter() - started
+
+        with self.lock:
+            self.signatures += 1
+            self.sign_time += latency
+            self.max_latency = max(self.max_latency, latency)
+        return base64.b64encode(signature).decode('utf-8')
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns signature counts and latency in seconds."""
+        with self.lock:
+            return {
+                'signatures': self.signatures,
+                'sign_time': self.sign_time,
+                'mean_latency': self.sign_time / self.signatures if self.signatures else 0.0,
+                'max_latency': self.max_latency,
+            }
+
 class KalshiBaseClient:
     """Base client class for interacting with the Kalshi API."""
     def __init__(
@@ -41,6 +221,7 @@ class KalshiBaseClient:
         """
         self.key_id = key_id
         self.private_key = private_key
+        self.signer = RequestSigner(private_key)
         self.environment = environment
         self.last_api_call = datetime.now()
 
@@ -74,42 +255,85 @@ class KalshiBaseClient:
 
     def sign_pss_text(self, text: str) -> str:
         """Signs the text using RSA-PSS and returns the base64 encoded signature."""
-        message = text.encode('utf-8')
-        try:
-            signature = self.private_key.sign(
-                message,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.DIGEST_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return base64.b64encode(signature).decode('utf-8')
-        except InvalidSignature as e:
-            raise ValueError("RSA sign PSS failed") from e
+        return self.signer.sign(text)
 
 class KalshiHttpClient(KalshiBaseClient):
-    """Client for handling HTTP connections to the Kalshi API."""
+    """Client for handling HTTP connections to the Kalshi API.
+
+    The client owns a pooled, keep-alive requests.Session so consecutive
+    pages of a cursor chain reuse the same TCP/TLS connection. Call close()
+    when finished, or use the client as a context manager.
+    """
     def __init__(
         self,
         key_id: str,
         private_key: rsa.RSAPrivateKey,
         environment: Environment = Environment.DEMO,
+        pool_maxsize: int = 10,
+        connect_retries: int = 3,
+        rate_limiter: Optional[KalshiRateLimiter] = None,
+        backoff: Optional[BackoffPolicy] = None,
     ):
+        """Initializes the client and its pooled HTTP session.
+
+        Args:
+            key_id (str): Your Kalshi API key ID.
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+            environment (Environment): The API environment to use (DEMO or PROD).
+            pool_maxsize (int): Number of keep-alive connections kept open to the host.
+            connect_retries (int): Retries on connection errors and resets.
+            rate_limiter (KalshiRateLimiter): Read/write token buckets. Pass the
+                same limiter (or one with the same state_dir) to every client
+                sharing an API key. Defaults to Kalshi's basic-tier limits.
+            backoff (BackoffPolicy): Retry and rate-tuning policy for throttled
+                and transient server-error responses.
+        """
         super().__init__(key_id, private_key, environment)
         self.host = self.HTTP_BASE_URL
         self.exchange_url = "/trade-api/v2/exchange"
         self.markets_url = "/trade-api/v2/markets"
         self.portfolio_url = "/trade-api/v2/portfolio"
+        self.session = self.build_session(pool_maxsize, connect_retries)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else KalshiRateLimiter()
+        self.backoff = backoff if backoff is not None else BackoffPolicy()
+
+    @staticmethod
+    def build_session(pool_maxsize: int, connect_retries: int) -> requests.Session:
+        """Creates a keep-alive session that retries on connection resets only."""
+        # Only connection-level failures are retried here; HTTP status codes
+        # are left to raise_if_bad_response so callers see them unchanged.
+        retries = Retry(
+            total=connect_retries,
+            connect=connect_retries,
+            read=connect_retries,
+            status=0,
+            other=0,
+            backoff_factor=0.2,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            max_retries=retries,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Closes the pooled HTTP session and its open connections."""
+        self.session.close()
 
-    def rate_limit(self) -> None:
-        """Built-in rate limiter to prevent exceeding API rate limits."""
-        THRESHOLD_IN_MILLISECONDS = 100
-        now = datetime.now()
-        threshold_in_microseconds = 1000 * THRESHOLD_IN_MILLISECONDS
-        threshold_in_seconds = THRESHOLD_IN_MILLISECONDS / 1000
-        if now - self.last_api_call < timedelta(microseconds=threshold_in_microseconds):
-            time.sleep(threshold_in_seconds)
+    def __enter__(self) -> "KalshiHttpClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def rate_limit(self, method: str = "GET") -> None:
+        """Waits for a token from the read or write bucket before a request."""
+        self.rate_limiter.wait(method)
         self.last_api_call = datetime.now()
 
     def raise_if_bad_response(self, response: requests.Response) -> None:
@@ -117,38 +341,40 @@ class KalshiHttpClient(KalshiBaseClient):
         if response.status_code not in range(200, 299):
             response.raise_for_status()
 
-    def post(self, path: str, body: dict) -> Any:
-        """Performs an authenticated POST request to the Kalshi API."""
-        self.rate_limit()
-        response = requests.post(
-            self.host + path,
-            json=body,
-            headers=self.request_headers("POST", path)
-        )
+    def request(self, method: str, path: str, **kwargs) -> Any:
+        """Performs an authenticated request, retrying per the backoff policy."""
+        bucket = self.rate_limiter.bucket_for(method)
+        attempt = 0
+        while True:
+            self.rate_limit(method)
+            started = time.monotonic()
+            response = self.session.request(
+                method,
+                self.host + path,
+                headers=self.request_headers(method, path),
+                **kwargs
+            )
+            self.backoff.on_response(bucket, response.status_code, time.monotonic() - started)
+            if not self.backoff.should_retry(method, response.status_code, attempt):
+                break
+            delay = self.backoff.retry_delay(attempt, response.headers.get("Retry-After"))
+            print(f"HTTP {response.status_code} on {method} {path}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
         self.raise_if_bad_response(response)
         return response.json()
 
+    def post(self, path: str, body: dict) -> Any:
+        """Performs an authenticated POST request to the Kalshi API."""
+        return self.request("POST", path, json=body)
+
     def get(self, path: str, params: Dict[str, Any] = {}) -> Any:
         """Performs an authenticated GET request to the Kalshi API."""
-        self.rate_limit()
-        response = requests.get(
-            self.host + path,
-            headers=self.request_headers("GET", path),
-            params=params
-        )
-        self.raise_if_bad_response(response)
-        return response.json()
+        return self.request("GET", path, params=params)
 
     def delete(self, path: str, params: Dict[str, Any] = {}) -> Any:
         """Performs an authenticated DELETE request to the Kalshi API."""
-        self.rate_limit()
-        response = requests.delete(
-            self.host + path,
-            headers=self.request_headers("DELETE", path),
-            params=params
-        )
-        self.raise_if_bad_response(response)
-        return response.json()
+        return self.request("DELETE", path, params=params)
 
     def get_balance(self) -> Dict[str, Any]:
         """Retrieves the account balance."""
@@ -178,6 +404,134 @@ class KalshiHttpClient(KalshiBaseClient):
         params = {k: v for k, v in params.items() if v is not None}
         return self.get(self.markets_url + '/trades', params=params)
 
+class KalshiAsyncHttpClient(KalshiBaseClient):
+    """Asyncio client for handling HTTP connections to the Kalshi API.
+
+    Requests are signed exactly as in KalshiHttpClient and share one pooled
+    aiohttp session, so many tickers' cursor chains can be fetched
+    concurrently. Use as an async context manager, or await close().
+    """
+    def __init__(
+        self,
+        key_id: str,
+        private_key: rsa.RSAPrivateKey,
+        environment: Environment = Environment.DEMO,
+        pool_maxsize: int = 10,
+        rate_limiter: Optional[KalshiRateLimiter] = None,
+        backoff: Optional[BackoffPolicy] = None,
+        sign_in_thread: bool = True,
+    ):
+        """Initializes the client. The aiohttp session is opened on first use.
+
+        Args:
+            key_id (str): Your Kalshi API key ID.
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+            environment (Environment): The API environment to use (DEMO or PROD).
+            pool_maxsize (int): Maximum number of simultaneous connections to the host.
+            rate_limiter (KalshiRateLimiter): Read/write token buckets shared by
+                all tasks using this client. Defaults to Kalshi's basic-tier limits.
+            backoff (BackoffPolicy): Retry and rate-tuning policy for throttled
+                and transient server-error responses.
+            sign_in_thread (bool): Sign requests in the loop's default thread
+                pool so RSA signing does not block other tasks.
+        """
+        super().__init__(key_id, private_key, environment)
+        self.host = self.HTTP_BASE_URL
+        self.exchange_url = "/trade-api/v2/exchange"
+        self.markets_url = "/trade-api/v2/markets"
+        self.portfolio_url = "/trade-api/v2/portfolio"
+        self.pool_maxsize = pool_maxsize
+        self.sign_in_thread = sign_in_thread
+        self.rate_limiter = rate_limiter if rate_limiter is not None else KalshiRateLimiter()
+        self.backoff = backoff if backoff is not None else BackoffPolicy()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Returns the pooled session, creating it inside the running event loop."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self) -> None:
+        """Closes the pooled HTTP session and its open connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "KalshiAsyncHttpClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def rate_limit(self, method: str = "GET") -> None:
+        """Waits for a token from the read or write bucket before a request."""
+        await self.rate_limiter.wait_async(method)
+        self.last_api_call = datetime.now()
+
+    async def request_headers_async(self, method: str, path: str) -> Dict[str, Any]:
+        """Generates the authentication headers, off the event loop if configured."""
+        if not self.sign_in_thread:
+            return self.request_headers(method, path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.request_headers, method, path)
+
+    async def request(self, method: str, path: str, **kwargs) -> Any:
+        """Performs an authenticated request, retrying per the backoff policy."""
+        bucket = self.rate_limiter.bucket_for(method)
+        attempt = 0
+        while True:
+            await self.rate_limit(method)
+            headers = await self.request_headers_async(method, path)
+            started = time.monotonic()
+            async with self.get_session().request(
+                method,
+                self.host + path,
+                headers=headers,
+                **kwargs
+            ) as response:
+                await self.backoff.on_response_async(bucket, response.status, time.monotonic() - started)
+                if not self.backoff.should_retry(method, response.status, attempt):
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+                delay = self.backoff.retry_delay(attempt, response.headers.get("Retry-After"))
+            print(f"HTTP {response.status} on {method} {path}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def post(self, path: str, body: dict) -> Any:
+        """Performs an authenticated POST request to the Kalshi API."""
+        return await self.request("POST", path, json=body)
+
+    async def get(self, path: str, params: Dict[str, Any] = {}) -> Any:
+        """Performs an authenticated GET request to the Kalshi API."""
+        return await self.request("GET", path, params=params)
+
+    async def delete(self, path: str, params: Dict[str, Any] = {}) -> Any:
+        """Performs an authenticated DELETE request to the Kalshi API."""
+        return await self.request("DELETE", path, params=params)
+
+    async def get_trades(
+        self,
+        ticker: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        max_ts: Optional[int] = None,
+        min_ts: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Retrieves trades based on provided filters."""
+        params = {
+            'ticker': ticker,
+            'limit': limit,
+            'cursor': cursor,
+            'max_ts': max_ts,
+            'min_ts': min_ts,
+        }
+        # Remove None values
+        params = {k: v for k, v in params.items() if v is not None}
+        return await self.get(self.markets_url + '/trades', params=params)
+
 class KalshiWebSocketClient(KalshiBaseClient):
     """Client for handling WebSocket connections to the Kalshi API."""
     def __init__(
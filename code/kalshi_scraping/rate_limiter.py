@@ -0,0 +1,265 @@
+#!/usr/bin/python
+
+"""
+Token-bucket rate limiting for the Kalshi API clients.
+
+Kalshi budgets reads and writes separately. A KalshiRateLimiter holds one
+bucket for each: tokens refill continuously at `rate` per second up to
+`burst`, and every request takes one token, waiting only for as long as it
+takes the bucket to refill rather than a fixed pause.
+
+Buckets are safe to share between threads and asyncio tasks. To share one
+API key's budget between several scraper processes on the same machine,
+give the limiter a state_dir: the bucket state then lives in small files
+guarded by an exclusive file lock, so every process draws from the same
+allowance. From asyncio, the file-backed buckets take the lock in the
+default executor, so waiting for another process never blocks the loop.
+
+"""
+
+import asyncio
+import contextlib
+import os
+import struct
+import threading
+import time
+
+
+# Kalshi basic-tier limits, in requests per second
+DEFAULT_READ_RATE = 20
+DEFAULT_WRITE_RATE = 10
+
+STATE_FORMAT = 'dd'  # tokens available, wall-clock time of last refill
+
+
+class TokenBucket:
+    """An in-process token bucket shared by all threads and tasks that use it."""
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            burst (float): Most tokens the bucket can hold. Defaults to rate,
+                i.e. one second's worth of requests.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.configured_rate = self.rate
+        self.burst = float(burst if burst is not None else rate)
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.updated_at = self.clock()
+
+        self.acquired = 0
+        self.tokens_waited = 0
+        self.time_slept = 0.0
+
+    def refill(self, tokens, updated_at, now):
+        """Returns the token count after refilling from updated_at to now."""
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def reserve(self, tokens=1):
+        """
+        Takes tokens from the bucket and returns how long the caller must
+        wait before using them. The bucket may go negative: later callers
+        then queue up behind the reservation instead of all waking at once.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = self.refill(self.tokens, self.updated_at, now) - tokens
+            self.updated_at = now
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.record(tokens, wait)
+        return wait
+
+    def record(self, tokens, wait):
+        """Updates the counters. Must be called with self.lock held."""
+        self.acquired += tokens
+        if wait > 0:
+            self.tokens_waited += tokens
+            self.time_slept += wait
+
+    def acquire(self, tokens=1):
+        """Blocks the calling thread until tokens are available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Suspends the calling task until tokens are available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def set_rate(self, rate):
+        """Changes the refill rate, keeping the tokens accrued so far."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = self.refill(self.tokens, self.updated_at, now)
+            self.updated_at = now
+            self.rate = float(rate)
+
+    async def set_rate_async(self, rate):
+        """set_rate, for callers on an event loop."""
+        self.set_rate(rate)
+
+    def stats(self):
+        """Returns the counters for this bucket."""
+        with self.lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'acquired': self.acquired,
+                'tokens_waited': self.tokens_waited,
+                'time_slept': self.time_slept,
+            }
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    A token bucket whose state lives in a file, so that every process on the
+    machine opening the same path shares one budget. An exclusive flock is
+    held only while reading and updating the state, never while sleeping.
+    Counters are kept per process. Unix only.
+
+    The file outlives the processes (and reboots), so it is stamped with
+    wall-clock time rather than the monotonic clock, which restarts at boot.
+    A stamp in the future (the clock was set back) gives a full bucket.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, path, rate, burst=None):
+        super().__init__(rate, burst)
+        self.path = path
+        # create the file with a full bucket if nobody has yet
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self.file_lock(fd):
+                if os.fstat(fd).st_size < struct.calcsize(STATE_FORMAT):
+                    self.write_state(fd, self.burst, self.clock())
+        finally:
+            os.close(fd)
+
+    def refill(self, tokens, updated_at, now):
+        if updated_at > now:
+            return self.burst
+        return super().refill(tokens, updated_at, now)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def file_lock(fd):
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def read_state(fd):
+        data = os.pread(fd, struct.calcsize(STATE_FORMAT), 0)
+        return struct.unpack(STATE_FORMAT, data)
+
+    @staticmethod
+    def write_state(fd, tokens, updated_at):
+        os.pwrite(fd, struct.pack(STATE_FORMAT, tokens, updated_at), 0)
+
+    def update_state(self, tokens):
+        """
+        Refills the shared state, takes tokens from it and returns what is
+        left. Must be called with self.lock held.
+        """
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            with self.file_lock(fd):
+                available, updated_at = self.read_state(fd)
+                now = self.clock()
+                available = self.refill(available, updated_at, now) - tokens
+                self.write_state(fd, available, now)
+        finally:
+            os.close(fd)
+        return available
+
+    def reserve(self, tokens=1):
+        with self.lock:
+            available = self.update_state(tokens)
+            wait = -available / self.rate if available < 0 else 0.0
+            self.record(tokens, wait)
+        return wait
+
+    def set_rate(self, rate):
+        with self.lock:
+            # bank what accrued at the old rate before switching
+            self.update_state(0)
+            self.rate = float(rate)
+
+    # flock and the file I/O block, so on an event loop they run in the
+    # default executor rather than stalling every other task
+
+    async def acquire_async(self, tokens=1):
+        loop = asyncio.get_running_loop()
+        wait = await loop.run_in_executor(None, self.reserve, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    async def set_rate_async(self, rate):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.set_rate, rate)
+
+
+class KalshiRateLimiter:
+    """Separate read and write token buckets for one Kalshi API key."""
+
+    WRITE_METHODS = ('POST', 'PUT', 'DELETE')
+
+    def __init__(
+        self,
+        read_rate=DEFAULT_READ_RATE,
+        write_rate=DEFAULT_WRITE_RATE,
+        read_burst=None,
+        write_burst=None,
+        state_dir=None,
+    ):
+        """
+        Args:
+            read_rate (float): GET requests allowed per second.
+            write_rate (float): POST/PUT/DELETE requests allowed per second.
+            read_burst (float): Read bucket size. Defaults to read_rate.
+            write_burst (float): Write bucket size. Defaults to write_rate.
+            state_dir (str): If given, the buckets are kept in files in this
+                directory and shared with every process using the same one.
+        """
+        if state_dir is None:
+            self.read_bucket = TokenBucket(read_rate, read_burst)
+            self.write_bucket = TokenBucket(write_rate, write_burst)
+        else:
+            os.makedirs(state_dir, exist_ok=True)
+            self.read_bucket = FileTokenBucket(os.path.join(state_dir, 'kalshi_read.bucket'),
+                                               read_rate, read_burst)
+            self.write_bucket = FileTokenBucket(os.path.join(state_dir, 'kalshi_write.bucket'),
+                                                write_rate, write_burst)
+
+    def bucket_for(self, method):
+        return self.write_bucket if method.upper() in self.WRITE_METHODS else self.read_bucket
+
+    def wait(self, method='GET'):
+        """Blocks until a request with this HTTP method may be sent."""
+        return self.bucket_for(method).acquire()
+
+    async def wait_async(self, method='GET'):
+        """Suspends the calling task until a request with this HTTP method may be sent."""
+        return await self.bucket_for(method).acquire_async()
+
+    def stats(self):
+        """Returns the read and write bucket counters."""
+        return {
+            'read': self.read_bucket.stats(),
+            'write': self.write_bucket.stats(),
+        }
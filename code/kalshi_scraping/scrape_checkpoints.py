@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+"""
+This file keeps a checkpoint journal for long scrapes so they can resume.
+
+The journal is a small SQLite file next to the output
+('<output>.checkpoint.sqlite'). For every ticker it records the cursor of
+the next page to fetch, the pages and rows written so far and whether the
+ticker is finished, together with the trade sink's position (see
+trade_sinks) at that moment. Each page is recorded in a single transaction
+after it has been written, so the journal never claims more than the
+partial output holds; on resume the sink truncates anything past the
+recorded position and the scrape continues from the recorded cursor.
+
+The journal is deleted once the scrape finishes successfully.
+
+"""
+
+import json
+import os
+import sqlite3
+from collections import namedtuple
+
+
+TickerState = namedtuple('TickerState', ['cursor', 'pages', 'rows', 'done'])
+
+NOT_STARTED = TickerState(cursor=None, pages=0, rows=0, done=False)
+
+
+class ScrapeJournal:
+    """Per-ticker cursor checkpoints for one output file."""
+
+    def __init__(self, output_filename):
+        self.path = output_filename + '.checkpoint.sqlite'
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS tickers (
+                ticker TEXT PRIMARY KEY,
+                cursor TEXT,
+                pages INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                done INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sink (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                position TEXT NOT NULL
+            );
+        ''')
+
+    def start(self, resume):
+        """
+        Begin a run. With resume=True, returns the sink position to resume
+        from (None if the journal is empty); otherwise clears the journal.
+        """
+        if not resume:
+            with self.conn:
+                self.conn.execute('DELETE FROM tickers')
+                self.conn.execute('DELETE FROM sink')
+            return None
+        row = self.conn.execute('SELECT position FROM sink').fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ticker_state(self, ticker):
+        """Where the given ticker's scrape got to."""
+        row = self.conn.execute(
+            'SELECT cursor, pages, rows, done FROM tickers WHERE ticker = ?', (ticker,)
+        ).fetchone()
+        if row is None:
+            return NOT_STARTED
+        return TickerState(cursor=row[0], pages=row[1], rows=row[2], done=bool(row[3]))
+
+    def record_page(self, ticker, cursor, rows, position, done=False):
+        """Record a written page: the next cursor, rows added and sink position."""
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO tickers (ticker, cursor, pages, rows, done) VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT (ticker) DO UPDATE SET
+                    cursor = excluded.cursor,
+                    pages = pages + 1,
+                    rows = rows + excluded.rows,
+                    done = excluded.done
+            ''', (ticker, cursor or None, rows, int(done)))
+            self.save_position(position)
+
+    def mark_done(self, ticker, rows, position):
+        """Record that a ticker is finished, adding any rows not yet recorded."""
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO tickers (ticker, cursor, pages, rows, done) VALUES (?, NULL, 0, ?, 1)
+                ON CONFLICT (ticker) DO UPDATE SET
+                    cursor = NULL,
+                    rows = rows + excluded.rows,
+                    done = 1
+            ''', (ticker, rows))
+            self.save_position(position)
+
+    def save_position(self, position):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO sink (id, position) VALUES (0, ?)', (json.dumps(position),)
+        )
+
+    def close(self, remove=False):
+        """Close the journal, deleting it if remove is set."""
+        self.conn.close()
+        if remove:
+            os.remove(self.path)
@@ -0,0 +1,189 @@
+#!/usr/bin/python
+
+"""
+This file defines the columnar trade archive format and reads/writes it.
+
+The archive is a Parquet file holding the same trades as the
+trade_level_data csvs, with compact types instead of text:
+
+    trade_id        string
+    ticker          dictionary-encoded string
+    count           uint32
+    created_time    int64 nanoseconds since the epoch, UTC
+    yes_price       uint8 (cents)
+    no_price        uint8 (cents)
+    taker_side      dictionary-encoded string
+
+There is no unnamed index column. read_trades() reads either format into
+the same DataFrame, so downstream code can switch between csv and Parquet
+by changing a file name.
+
+Run this file to convert the existing csvs in data/trade_level_data to
+Parquet archives alongside them:
+
+    python code/kalshi_scraping/trade_archive.py
+
+Reading and writing Parquet requires pyarrow; csvs do not.
+
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+from trade_buffer import TRADE_COLUMNS
+
+
+def archive_schema():
+    """The Arrow schema of a trade archive."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('trade_id', pa.string()),
+        ('ticker', pa.dictionary(pa.int32(), pa.string())),
+        ('count', pa.uint32()),
+        ('created_time', pa.timestamp('ns', tz='UTC')),
+        ('yes_price', pa.uint8()),
+        ('no_price', pa.uint8()),
+        ('taker_side', pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def is_archive(filename):
+    return filename.endswith('.parquet')
+
+
+def to_archive_table(trades):
+    """Convert a DataFrame of trades, as returned by the API or read from a
+    csv, into an Arrow table with the archive schema."""
+    import pyarrow as pa
+
+    trades = trades.reindex(columns=TRADE_COLUMNS)
+    frame = pd.DataFrame({
+        'trade_id': trades['trade_id'].astype('string'),
+        'ticker': trades['ticker'].astype('string'),
+        'count': pd.to_numeric(trades['count']).astype('uint32'),
+        'created_time': pd.to_datetime(trades['created_time'], utc=True, format='ISO8601'),
+        'yes_price': pd.to_numeric(trades['yes_price']).astype('uint8'),
+        'no_price': pd.to_numeric(trades['no_price']).astype('uint8'),
+        'taker_side': trades['taker_side'].astype('string'),
+    })
+    return pa.Table.from_pandas(frame, schema=archive_schema(), preserve_index=False)
+
+
+def write_archive(trades, filename):
+    """Write a DataFrame of trades as a Parquet archive, atomically."""
+    import pyarrow.parquet as pq
+
+    tmp_filename = filename + '.tmp'
+    pq.write_table(to_archive_table(trades), tmp_filename)
+    os.replace(tmp_filename, filename)
+
+
+def read_trades(filename, columns=None, filters=None):
+    """
+    Read a trade archive (Parquet) or trade_level_data csv into a DataFrame,
+    optionally only some columns. filters are pyarrow row filters, e.g.
+    [('ticker', '==', 'FED-25DEC-T4.00')], and only apply to Parquet.
+    """
+    if is_archive(filename):
+        import pyarrow.parquet as pq
+        return pq.read_table(filename, columns=columns, filters=filters).to_pandas()
+    trades = pd.read_csv(filename, usecols=columns)
+    return trades.drop(columns=['Unnamed: 0'], errors='ignore')
+
+
+def read_trades_after(filename, first_row, columns=None):
+    """
+    Read only the trades from row first_row on, e.g. those appended since a
+    file had first_row rows. Parquet row groups before it are not decoded;
+    csv rows before it are skipped without being parsed.
+    """
+    if is_archive(filename):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(filename)
+        tables, offset = [], 0
+        for i in range(parquet_file.num_row_groups):
+            n = parquet_file.metadata.row_group(i).num_rows
+            if offset + n > first_row:
+                table = parquet_file.read_row_group(i, columns=columns)
+                tables.append(table.slice(max(first_row - offset, 0)))
+            offset += n
+        if not tables:
+            empty = parquet_file.schema_arrow.empty_table()
+            return (empty.select(columns) if columns else empty).to_pandas()
+        return pa.concat_tables(tables).to_pandas()
+    trades = pd.read_csv(filename, usecols=columns, skiprows=range(1, first_row + 1))
+    return trades.drop(columns=['Unnamed: 0'], errors='ignore')
+
+
+def append_to_archive(filename, trades, first_index):
+    """
+    Append a DataFrame of trades to an archive or csv. csvs are appended in
+    place, continuing the unnamed index column from first_index; if the
+    write fails, the file is truncated back to its previous size. A missing
+    file is created.
+
+    A Parquet file cannot be appended to in place: its footer has to come
+    last. The archive is copied one row group at a time into a new file,
+    the trades are added as one more row group, and the copy replaces the
+    archive. Memory stays at one row group, and earlier appends stay
+    separate row groups (which read_trades_after skips), but every append
+    still reads and writes the whole file. For archives that keep growing,
+    use a TradeStore, where an update only rewrites the partitions of the
+    contracts it fetched.
+    """
+    if len(trades) == 0:
+        return
+
+    if not os.path.exists(filename):
+        if is_archive(filename):
+            write_archive(trades, filename)
+        else:
+            trades = trades.reindex(columns=TRADE_COLUMNS)
+            trades.index = pd.RangeIndex(first_index, first_index + len(trades))
+            trades.to_csv(filename)
+        return
+
+    if is_archive(filename):
+        import pyarrow.parquet as pq
+
+        archive = pq.ParquetFile(filename)
+        tmp_filename = filename + '.tmp'
+        with pq.ParquetWriter(tmp_filename, archive_schema()) as writer:
+            for i in range(archive.num_row_groups):
+                writer.write_table(archive.read_row_group(i))
+            writer.write_table(to_archive_table(trades))
+        os.replace(tmp_filename, filename)
+        return
+
+    columns = pd.read_csv(filename, nrows=0).columns[1:]
+    trades = trades.reindex(columns=columns)
+    trades.index = pd.RangeIndex(first_index, first_index + len(trades))
+
+    size = os.path.getsize(filename)
+    try:
+        with open(filename, 'a', newline='') as f:
+            trades.to_csv(f, header=False)
+    except BaseException:
+        os.truncate(filename, size)
+        raise
+
+
+def convert_csv_to_archive(csv_filename, archive_filename=None):
+    """Convert one trade_level_data csv into a Parquet archive."""
+    if archive_filename is None:
+        archive_filename = os.path.splitext(csv_filename)[0] + '.parquet'
+    write_archive(read_trades(csv_filename), archive_filename)
+    return archive_filename
+
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/trade_level_data'
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith('.csv'):
+            archive_filename = convert_csv_to_archive(os.path.join(data_dir, name))
+            print(f"Converted {name} -> {os.path.basename(archive_filename)}")
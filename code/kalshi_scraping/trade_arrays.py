@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+"""
+This file exposes a trade archive as memory-mapped NumPy arrays.
+
+Parsing a csv, or even decoding Parquet, copies every trade into each
+process that reads it. Instead, open_trade_arrays() keeps a cache of plain
+.npy files next to the archive ('<archive>.arrays/'), one per column:
+
+    ticker_code     int32, index into tickers
+    created_time    int64 nanoseconds since the epoch, UTC
+    yes_price       uint8 (cents)
+    count           uint32
+    taker_side      int8, index into TAKER_SIDES
+
+Rows are sorted by ticker and then created_time, so every ticker's trades
+are one contiguous slice (see TradeArrays.ticker_slice). The files are
+opened with mmap_mode='r': loading costs nothing up front, and worker
+processes reading the same cache share one copy of it through the page
+cache.
+
+The cache is stamped with the archive's size and modification time and
+rebuilt if the archive has changed since.
+
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from trade_archive import read_trades
+
+
+ARRAY_COLUMNS = {
+    'ticker_code': np.int32,
+    'created_time': np.int64,
+    'yes_price': np.uint8,
+    'count': np.uint32,
+    'taker_side': np.int8,
+}
+
+TAKER_SIDES = ['yes', 'no']
+
+
+class TradeArrays:
+    """Read-only, memory-mapped column arrays of one archive's trades."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.tickers = meta['tickers']
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.rows = meta['rows']
+        # ticker i's rows are offsets[i]:offsets[i + 1]
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'))
+        for column in ARRAY_COLUMNS:
+            setattr(self, column, np.load(os.path.join(directory, column + '.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return self.rows
+
+    def ticker_slice(self, ticker):
+        """The slice of rows holding ticker's trades, in time order."""
+        i = self.ticker_index[ticker]
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def to_frame(self, rows=slice(None)):
+        """A DataFrame of the given rows (this copies them out of the map)."""
+        return pd.DataFrame({
+            'ticker': pd.Categorical.from_codes(self.ticker_code[rows], self.tickers),
+            'created_time': pd.to_datetime(self.created_time[rows], utc=True),
+            'yes_price': self.yes_price[rows],
+            'count': self.count[rows],
+            'taker_side': pd.Categorical.from_codes(self.taker_side[rows], TAKER_SIDES),
+        })
+
+
+def archive_stamp(archive_filename):
+    stat = os.stat(archive_filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_trade_arrays(archive_filename, directory):
+    """Build the array cache for an archive (or trade csv) in directory."""
+    trades = read_trades(archive_filename, columns=['ticker', 'created_time', 'yes_price', 'count', 'taker_side'])
+    created_time = pd.to_datetime(trades['created_time'], utc=True, format='ISO8601')
+
+    tickers, ticker_code = np.unique(trades['ticker'].astype(str).to_numpy(), return_inverse=True)
+    columns = {
+        'ticker_code': ticker_code,
+        'created_time': created_time.dt.as_unit('ns').astype(np.int64).to_numpy(),
+        'yes_price': trades['yes_price'].to_numpy(),
+        'count': trades['count'].to_numpy(),
+        'taker_side': pd.Categorical(trades['taker_side'], categories=TAKER_SIDES).codes,
+    }
+    order = np.lexsort((columns['created_time'], columns['ticker_code']))
+    offsets = np.searchsorted(ticker_code[order], np.arange(len(tickers) + 1))
+
+    os.makedirs(directory, exist_ok=True)
+    for column, dtype in ARRAY_COLUMNS.items():
+        np.save(os.path.join(directory, column + '.npy'), np.asarray(columns[column])[order].astype(dtype))
+    np.save(os.path.join(directory, 'offsets.npy'), offsets.astype(np.int64))
+
+    # meta.json goes last: a cache without it is incomplete and is rebuilt
+    meta = {'archive': archive_stamp(archive_filename), 'rows': len(trades), 'tickers': tickers.tolist()}
+    tmp_path = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+
+def open_trade_arrays(archive_filename, directory=None):
+    """Memory-map an archive's trades, building or refreshing the cache first."""
+    if directory is None:
+        directory = archive_filename + '.arrays'
+    meta_path = os.path.join(directory, 'meta.json')
+    fresh = False
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            fresh = json.load(f).get('archive') == archive_stamp(archive_filename)
+    if not fresh:
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        write_trade_arrays(archive_filename, directory)
+    return TradeArrays(directory)
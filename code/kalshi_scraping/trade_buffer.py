@@ -0,0 +1,88 @@
+#!/usr/bin/python
+
+"""
+This file collects pages of trades from the Kalshi API into columns.
+
+Appending each page to a DataFrame with pd.concat copies everything
+collected so far, so a scrape gets quadratically slower as it goes. The
+buffer instead extends one Python list per column as pages arrive, packs
+those lists into a DataFrame chunk, with the numeric columns typed (see
+TRADE_DTYPES), every chunk_rows rows, and joins the chunks with a single
+concat when the full frame is asked for.
+
+"""
+
+import pandas as pd
+
+
+# Columns returned by the trades endpoint, in the order we save them
+TRADE_COLUMNS = ['trade_id', 'ticker', 'count', 'created_time',
+                 'yes_price', 'no_price', 'taker_side']
+
+# dtypes of the numeric columns in the chunks. They are nullable, so a trade
+# missing a field does not turn the whole column into floats (and '5' into
+# '5.0' in the csvs). The other columns are kept as the API's text.
+TRADE_DTYPES = {'count': 'Int64', 'yes_price': 'Int64', 'no_price': 'Int64'}
+
+
+def with_trade_dtypes(frame):
+    """frame with TRADE_DTYPES applied to the columns it has."""
+    return frame.astype({column: dtype for column, dtype in TRADE_DTYPES.items() if column in frame})
+
+
+class TradePageBuffer:
+    """Columnar accumulator for pages of trade dicts."""
+
+    def __init__(self, columns=TRADE_COLUMNS, chunk_rows=50_000):
+        self.columns = {column: [] for column in columns}
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+        self.n_pending = 0
+        self.n_rows = 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def append_page(self, trades):
+        """Add one page (a list of trade dicts) to the buffer."""
+        if not trades:
+            return
+
+        # the API occasionally adds fields; keep them, padding earlier rows
+        for trade in trades:
+            for key in trade:
+                if key not in self.columns:
+                    self.columns[key] = [None] * self.n_pending
+
+        for column, values in self.columns.items():
+            values.extend([trade.get(column) for trade in trades])
+        self.n_pending += len(trades)
+        self.n_rows += len(trades)
+
+        if self.n_pending >= self.chunk_rows:
+            self.pack()
+
+    def pack(self):
+        """Move the pending rows into a DataFrame chunk."""
+        if self.n_pending:
+            self.chunks.append(with_trade_dtypes(pd.DataFrame(self.columns, columns=list(self.columns))))
+            for column in self.columns:
+                self.columns[column] = []
+            self.n_pending = 0
+
+    def to_frame(self):
+        """Build a DataFrame of everything buffered so far."""
+        self.pack()
+        if not self.chunks:
+            return with_trade_dtypes(pd.DataFrame(columns=list(self.columns)))
+        if len(self.chunks) > 1:
+            self.chunks = [pd.concat(self.chunks, ignore_index=True)]
+        return self.chunks[0]
+
+    def clear(self):
+        """Drop the buffered rows, keeping the columns seen so far."""
+        for column in self.columns:
+            self.columns[column] = []
+        self.chunks = []
+        self.n_pending = 0
+        self.n_rows = 0
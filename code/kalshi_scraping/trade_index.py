@@ -0,0 +1,121 @@
+#!/usr/bin/python
+
+"""
+This file keeps a persistent index of the trade_ids already in an archive.
+
+Each trade_id is hashed to a 64-bit integer and the hashes are kept as a
+sorted NumPy array in '<archive>.trade_ids.npy', memory-mapped on load.
+Checking a page of new trades against it is a binary search per trade, so
+deduplicating an update costs O(new rows log archive rows) instead of a
+drop_duplicates over the whole merged archive. With 64-bit hashes the
+chance of any collision across a million trades is around 1 in 30 million.
+
+A small '<archive>.trade_ids.json' records the archive's row count and its
+size and modification time when the index was saved. If the archive has
+been rewritten by anything else since, the index is rebuilt from it.
+
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from trade_archive import read_trades
+
+
+def hash_trade_ids(trade_ids):
+    """64-bit hashes of an iterable of trade_id strings."""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(trade_id).encode('utf-8'), digest_size=8).digest(), 'little')
+         for trade_id in trade_ids),
+        dtype=np.uint64,
+    )
+
+
+class TradeIdIndex:
+    """Sorted, persistent set of hashed trade_ids for one archive."""
+
+    def __init__(self, archive_filename):
+        self.archive_filename = archive_filename
+        self.path = archive_filename + '.trade_ids.npy'
+        self.meta_path = archive_filename + '.trade_ids.json'
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.pending = []
+        self.rows = 0
+
+        if not self.load():
+            self.rebuild()
+
+    def archive_stamp(self):
+        stat = os.stat(self.archive_filename)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def load(self):
+        """Memory-map the saved index if it still matches the archive."""
+        if not (os.path.exists(self.path) and os.path.exists(self.meta_path)
+                and os.path.exists(self.archive_filename)):
+            return False
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta.get('archive') != self.archive_stamp():
+            return False
+        self.hashes = np.load(self.path, mmap_mode='r')
+        self.rows = meta['rows']
+        return True
+
+    def rebuild(self):
+        """Hash every trade_id in the archive."""
+        if not os.path.exists(self.archive_filename):
+            return
+        trade_ids = read_trades(self.archive_filename, columns=['trade_id'])['trade_id']
+        self.rows = len(trade_ids)
+        self.hashes = np.unique(hash_trade_ids(trade_ids))
+
+    def contains(self, hashes):
+        """Boolean mask of which hashes are already in the index."""
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(self.hashes, hashes)
+        positions[positions == len(self.hashes)] = 0
+        return self.hashes[positions] == hashes
+
+    def filter_new(self, trades):
+        """
+        Keep only the trades (list of dicts) whose trade_id is neither in the
+        index nor earlier in this same list, and add them to the index.
+        """
+        if not trades:
+            return trades
+        hashes = hash_trade_ids(trade['trade_id'] for trade in trades)
+
+        # first occurrence of each id within the batch
+        _, first = np.unique(hashes, return_index=True)
+        keep = np.zeros(len(trades), dtype=bool)
+        keep[first] = True
+        keep &= ~self.contains(hashes)
+        if self.pending:
+            keep &= ~np.isin(hashes, np.concatenate(self.pending))
+
+        self.pending.append(hashes[keep])
+        self.rows += int(keep.sum())
+        return [trade for trade, new in zip(trades, keep) if new]
+
+    def save(self):
+        """Merge in the new hashes and write the index, stamped with the archive."""
+        if not os.path.exists(self.archive_filename):
+            # nothing has been archived yet, so there is nothing to index
+            return
+        merged = np.concatenate([np.asarray(self.hashes)] + self.pending)
+        merged.sort(kind='stable')
+        tmp_path = self.path + '.tmp.npy'
+        np.save(tmp_path, merged)
+        os.replace(tmp_path, self.path)
+        self.hashes = merged
+        self.pending = []
+
+        tmp_meta = self.meta_path + '.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump({'archive': self.archive_stamp(), 'rows': self.rows}, f)
+        os.replace(tmp_meta, self.meta_path)
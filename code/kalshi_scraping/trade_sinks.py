@@ -0,0 +1,171 @@
+#!/usr/bin/python
+
+"""
+This file writes scraped trades to disk as the scrape goes.
+
+A sink appends trades to a temporary '<output>.partial' as they arrive, so
+memory never has to hold the whole scrape. When the scrape finishes,
+finalize() flushes everything to disk and renames it over the output in one
+step, so the output is never left half-written. If the scrape fails, the
+partial output is left in place.
+
+After every write, position() describes how much of the partial output is
+complete. A scrape that records that position (see scrape_checkpoints) can
+reopen the sink with resume_from=position: anything written after that
+point is thrown away and writing carries on from there.
+
+The format follows the output file's extension: '.parquet' writes a
+Parquet trade archive (see trade_archive, requires pyarrow), anything else
+writes a CSV in the same layout as before, including the unnamed index
+column.
+
+"""
+
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from trade_buffer import TRADE_COLUMNS
+from trade_archive import archive_schema, to_archive_table
+
+
+class TradeSink(ABC):
+    """Base class for streaming trade writers. Use as a context manager."""
+
+    def __init__(self, output_filename, columns=TRADE_COLUMNS, resume_from=None):
+        self.output_filename = output_filename
+        self.partial_filename = output_filename + '.partial'
+        self.columns = list(columns)
+        self.rows_written = 0
+        if resume_from is not None:
+            self.rows_written = resume_from['rows']
+
+    def write(self, trades):
+        """Append a DataFrame of trades to the partial output."""
+        if len(trades) == 0:
+            return
+        # fix the column set so every chunk lines up with the first
+        self.write_frame(trades.reindex(columns=self.columns))
+        self.rows_written += len(trades)
+
+    @abstractmethod
+    def write_frame(self, frame):
+        """Append frame, already in self.columns, to the partial output."""
+
+    @abstractmethod
+    def position(self):
+        """A JSON-able description of how much has been durably written."""
+
+    @abstractmethod
+    def close(self):
+        """Flush and close the partial output, if it is open."""
+
+    def finalize(self):
+        """Close the partial output and atomically move it over the output."""
+        self.close()
+        if not os.path.exists(self.partial_filename):
+            # nothing was scraped; still leave a valid, empty output
+            self.write_frame(pd.DataFrame(columns=self.columns))
+            self.close()
+        os.replace(self.partial_filename, self.output_filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finalize()
+        else:
+            self.close()
+
+
+class CsvTradeSink(TradeSink):
+    """Appends trades to a CSV with a running unnamed index column."""
+
+    def __init__(self, output_filename, columns=TRADE_COLUMNS, resume_from=None):
+        super().__init__(output_filename, columns, resume_from)
+        self.file = None
+        if resume_from is not None and resume_from['offset'] > 0:
+            # drop anything written after the last recorded position
+            self.file = open(self.partial_filename, 'r+', newline='')
+            self.file.truncate(resume_from['offset'])
+            self.file.seek(resume_from['offset'])
+
+    def write_frame(self, frame):
+        header = self.file is None
+        if self.file is None:
+            self.file = open(self.partial_filename, 'w', newline='')
+        frame.index = pd.RangeIndex(self.rows_written, self.rows_written + len(frame))
+        frame.to_csv(self.file, header=header)
+        self.file.flush()
+
+    def position(self):
+        offset = self.file.tell() if self.file is not None else 0
+        return {'offset': offset, 'rows': self.rows_written}
+
+    def close(self):
+        if self.file is not None:
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+
+class ParquetTradeSink(TradeSink):
+    """
+    Writes each chunk of trades as its own small Parquet file in
+    '<output>.parts/', since a Parquet file is unreadable until its footer is
+    written. finalize() streams the parts, in order, into one Parquet file
+    with a row group per part.
+    """
+
+    def __init__(self, output_filename, columns=TRADE_COLUMNS, resume_from=None):
+        super().__init__(output_filename, columns, resume_from)
+        self.parts_dir = output_filename + '.parts'
+        self.n_parts = 0
+        if resume_from is not None:
+            self.n_parts = resume_from['parts']
+        if os.path.isdir(self.parts_dir):
+            # drop parts written after the last recorded position
+            for name in os.listdir(self.parts_dir):
+                if int(name.split('.')[0]) >= self.n_parts:
+                    os.remove(os.path.join(self.parts_dir, name))
+        os.makedirs(self.parts_dir, exist_ok=True)
+
+    def part_filename(self, i):
+        return os.path.join(self.parts_dir, f'{i:06d}.parquet')
+
+    def write_frame(self, frame):
+        import pyarrow.parquet as pq
+
+        table = to_archive_table(frame)
+        # write under a temporary name so a part is either whole or absent
+        tmp_filename = self.part_filename(self.n_parts) + '.tmp'
+        pq.write_table(table, tmp_filename)
+        os.replace(tmp_filename, self.part_filename(self.n_parts))
+        self.n_parts += 1
+
+    def position(self):
+        return {'parts': self.n_parts, 'rows': self.rows_written}
+
+    def close(self):
+        pass
+
+    def finalize(self):
+        import pyarrow.parquet as pq
+
+        if self.n_parts == 0:
+            self.write_frame(pd.DataFrame(columns=self.columns))
+        with pq.ParquetWriter(self.partial_filename, archive_schema()) as writer:
+            for i in range(self.n_parts):
+                writer.write_table(pq.read_table(self.part_filename(i)))
+        os.replace(self.partial_filename, self.output_filename)
+        shutil.rmtree(self.parts_dir)
+
+
+def open_trade_sink(output_filename, columns=TRADE_COLUMNS, resume_from=None):
+    """Pick a sink for output_filename based on its extension."""
+    if output_filename.endswith('.parquet'):
+        return ParquetTradeSink(output_filename, columns, resume_from)
+    return CsvTradeSink(output_filename, columns, resume_from)
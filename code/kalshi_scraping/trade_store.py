@@ -0,0 +1,165 @@
+#!/usr/bin/python
+
+"""
+This file keeps trades in a store partitioned by series and contract.
+
+Instead of one archive per dataset holding every contract since 2022, the
+store keeps one Parquet trade archive (see trade_archive) per contract
+preamble, grouped into a directory per series:
+
+    <root>/manifest.json
+    <root>/FED/FED-25DEC.parquet
+    <root>/FED/FED-25OCT.parquet
+    <root>/KXCPIYOY/KXCPIYOY-25JUN.parquet
+    ...
+
+The series is the first dash-separated part of a ticker and the preamble
+the first two (FED-25DEC-T4.00 -> FED, FED-25DEC). Settled contracts never
+receive new trades, so an update only rewrites the partitions of the live
+contracts it fetched.
+
+The manifest records each partition's file, row count, number of tickers
+and first and last trade time. Readers use it to pick partitions by
+series, preamble or date range without opening the others.
+
+Each partition is an ordinary archive, so the trade_id index and
+watermarks (see trade_index and trade_watermarks) work per partition.
+
+Run this file to build a store in data/trade_store from the csvs in
+data/trade_level_data:
+
+    python code/kalshi_scraping/trade_store.py
+
+"""
+
+import json
+import os
+import sys
+
+import pandas as pd
+
+from trade_archive import append_to_archive, read_trades
+
+
+def partition_key(ticker):
+    """The (series, preamble) partition a ticker belongs to."""
+    series, event = ticker.split('-')[:2]
+    return series, f'{series}-{event}'
+
+
+class TradeStore:
+    """A directory of per-contract trade archives with a manifest."""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.partitions = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.partitions = json.load(f)['partitions']
+
+    def partition_filename(self, preamble):
+        series = preamble.split('-')[0]
+        return os.path.join(self.root, series, preamble + '.parquet')
+
+    def filenames_for_tickers(self, tickers):
+        """Group tickers by the partition file they are stored in."""
+        groups = {}
+        for ticker in tickers:
+            _, preamble = partition_key(ticker)
+            groups.setdefault(self.partition_filename(preamble), []).append(ticker)
+        return groups
+
+    def write(self, trades):
+        """Append a DataFrame of trades to the partitions they belong to."""
+        if len(trades) == 0:
+            return
+        preambles = trades['ticker'].astype(str).str.split('-', n=2).str[:2].str.join('-')
+        for preamble, group in trades.groupby(preambles.to_numpy(), sort=False):
+            filename = self.partition_filename(preamble)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            append_to_archive(filename, group, 0)
+        self.refresh(preambles.unique())
+
+    def refresh(self, preambles):
+        """Re-read the manifest entries of the given partitions and save."""
+        for preamble in preambles:
+            filename = self.partition_filename(preamble)
+            if not os.path.exists(filename):
+                self.partitions.pop(preamble, None)
+                continue
+            trades = read_trades(filename, columns=['ticker', 'created_time'])
+            self.partitions[preamble] = {
+                'series': preamble.split('-')[0],
+                'file': os.path.relpath(filename, self.root),
+                'rows': len(trades),
+                'tickers': int(trades['ticker'].nunique()),
+                'first_trade': trades['created_time'].min().isoformat() if len(trades) else None,
+                'last_trade': trades['created_time'].max().isoformat() if len(trades) else None,
+            }
+        self.save()
+
+    def select(self, series=None, preambles=None, start=None, end=None):
+        """
+        Preambles of the partitions matching every given condition: one of
+        series, one of preambles, and trades overlapping [start, end].
+        """
+        start = pd.Timestamp(start, tz='UTC') if start is not None else None
+        end = pd.Timestamp(end, tz='UTC') if end is not None else None
+        selected = []
+        for preamble, entry in sorted(self.partitions.items()):
+            if series is not None and entry['series'] not in series:
+                continue
+            if preambles is not None and preamble not in preambles:
+                continue
+            if entry['rows'] == 0:
+                continue
+            if start is not None and pd.Timestamp(entry['last_trade']) < start:
+                continue
+            if end is not None and pd.Timestamp(entry['first_trade']) > end:
+                continue
+            selected.append(preamble)
+        return selected
+
+    def read(self, series=None, preambles=None, start=None, end=None, columns=None):
+        """Read the trades of the selected partitions into one DataFrame."""
+        filters = []
+        if start is not None:
+            filters.append(('created_time', '>=', pd.Timestamp(start, tz='UTC')))
+        if end is not None:
+            filters.append(('created_time', '<=', pd.Timestamp(end, tz='UTC')))
+
+        frames = [
+            read_trades(os.path.join(self.root, self.partitions[preamble]['file']),
+                        columns=columns, filters=filters or None)
+            for preamble in self.select(series, preambles, start, end)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        # tickers are dictionary-encoded per partition; unify them as strings
+        trades = pd.concat(frames, ignore_index=True)
+        for column in ('ticker', 'taker_side'):
+            if column in trades and trades[column].dtype == 'category':
+                trades[column] = trades[column].astype(str)
+        return trades
+
+    def import_file(self, filename):
+        """Split an existing trade csv or archive into the store."""
+        self.write(read_trades(filename))
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'partitions': dict(sorted(self.partitions.items()))}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/trade_level_data'
+    store = TradeStore(sys.argv[2] if len(sys.argv) > 2 else 'data/trade_store')
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith('.csv') or name.endswith('.parquet'):
+            store.import_file(os.path.join(data_dir, name))
+            print(f"Imported {name}")
+    print(f"{len(store.partitions)} partitions in {store.root}")
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+
+"""
+This file appends new Kalshi trades to a trade archive.
+
+update_trades() is the body of update_kalshi in update_kalshi_trades.py,
+with the HTTP client passed in instead of taken from the script's globals,
+so that it can be called from other programs (e.g. the pipeline runner,
+which updates several archives from separate processes). connect() builds
+a client from the same environment variables the scripts use.
+
+"""
+
+import os
+
+from clients_kalshi import KalshiHttpClient, Environment
+from trade_archive import append_to_archive
+from trade_buffer import TradePageBuffer
+from trade_index import TradeIdIndex
+from trade_watermarks import TradeWatermarks
+
+
+def connect(env_file='env.env', environment=Environment.PROD, rate_limiter=None):
+    """
+    A KalshiHttpClient for the key in KALSHI_KEYID and KALSHI_KEYFILE (see
+    example.env). Processes sharing the key should pass limiters with the
+    same state_dir, e.g. KalshiRateLimiter(state_dir=...), so that they draw
+    from one budget; the default limiter only paces this process.
+    """
+    from dotenv import load_dotenv
+    from cryptography.hazmat.primitives import serialization
+
+    load_dotenv(env_file)
+    keyfile = os.getenv('KALSHI_KEYFILE')
+    if keyfile is None:
+        raise FileNotFoundError(f"KALSHI_KEYFILE is not set (see example.env, loaded from {env_file})")
+    try:
+        with open(keyfile, 'rb') as key_file:
+            private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Private key file not found at {keyfile}")
+    return KalshiHttpClient(key_id=os.getenv('KALSHI_KEYID'), private_key=private_key, environment=environment,
+                            rate_limiter=rate_limiter)
+
+
+def update_trades(client, output_filename, tickers, incremental=False):
+    """
+    Fetch the trades of tickers and append the ones not yet in
+    output_filename to it, deduplicated on trade_id (see trade_index). With
+    incremental=True only trades since each ticker's watermark are fetched
+    (see trade_watermarks). Returns the number of trades appended.
+    """
+    index = TradeIdIndex(output_filename)
+    first_index = index.rows
+    if incremental:
+        watermarks = TradeWatermarks(output_filename)
+
+    # new pages are collected column by column and appended to the archive once
+    new_trades = TradePageBuffer()
+
+    for ticker in tickers:
+
+        print(f"Fetching: {ticker}")
+
+        # only ask for trades since the ticker's watermark (None fetches everything)
+        min_ts = watermarks.min_ts(ticker) if incremental else None
+        ticker_trades = []
+
+        # get the trades on the first page, keep the ones we don't have and hold the cursor
+        trades = client.get_trades(ticker=ticker, min_ts=min_ts)
+        print(f"First page rows: {len(trades['trades'])}")
+
+        ticker_trades.extend(index.filter_new(trades['trades']))
+        cursor = trades.get('cursor')
+
+        page = 1
+
+        # for each page, get the trades and keep the new ones, get the new cursor
+        # when we hit the end, cursor will turn null and we'll exit the loop
+        while cursor:
+
+            print(f"  Page {page} cursor: {cursor}")
+            trades = client.get_trades(ticker=ticker, cursor=cursor, min_ts=min_ts)
+
+            print(f"  Page {page} rows: {len(trades['trades'])}")
+            ticker_trades.extend(index.filter_new(trades['trades']))
+
+            cursor = trades.get('cursor')
+            page += 1
+
+        print(f"  New rows: {len(ticker_trades)}")
+        if incremental:
+            watermarks.advance(ticker, ticker_trades)
+
+        new_trades.append_page(ticker_trades)
+
+    # Append the new trades to output_filename and save the updated index
+    frame = new_trades.to_frame()
+    append_to_archive(output_filename, frame, first_index)
+    index.save()
+    if incremental:
+        watermarks.save()
+    return len(frame)
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+"""
+This file tracks per-ticker high-watermarks for incremental updates.
+
+For each ticker in a trade archive we keep the latest created_time seen.
+An update then only asks the API for trades from that second on
+(get_trades' min_ts); the few at the boundary that the archive already
+has are dropped by trade_index.
+
+Watermarks are cached in '<archive>.watermarks.json' together with the
+archive's size and modification time. If the archive has been rewritten
+by anything else since, the cache is rebuilt from the archive itself.
+
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from trade_archive import read_trades
+
+
+class TradeWatermarks:
+    """Latest created_time per ticker."""
+
+    def __init__(self, archive_filename):
+        self.archive_filename = archive_filename
+        self.path = archive_filename + '.watermarks.json'
+        self.tickers = {}
+
+        if not self.load_cache():
+            self.rebuild()
+
+    def archive_stamp(self):
+        stat = os.stat(self.archive_filename)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def load_cache(self):
+        """Load the cached watermarks if they still match the archive."""
+        if not os.path.exists(self.path) or not os.path.exists(self.archive_filename):
+            return False
+        with open(self.path) as f:
+            cache = json.load(f)
+        if cache.get('archive') != self.archive_stamp():
+            return False
+        self.tickers = {
+            ticker: pd.Timestamp(mark['created_time'])
+            for ticker, mark in cache['tickers'].items()
+        }
+        return True
+
+    def rebuild(self):
+        """Scan the archive for the latest trade of every ticker."""
+        if not os.path.exists(self.archive_filename):
+            return
+        archive = read_trades(self.archive_filename, columns=['ticker', 'created_time'])
+        if archive.empty:
+            return
+
+        archive['created_time'] = pd.to_datetime(archive['created_time'], utc=True, format='ISO8601')
+        self.tickers = archive.groupby('ticker', observed=True)['created_time'].max().to_dict()
+
+    def min_ts(self, ticker):
+        """The min_ts (unix seconds) to request for ticker, or None if unseen."""
+        if ticker not in self.tickers:
+            return None
+        return int(self.tickers[ticker].timestamp())
+
+    def advance(self, ticker, trades):
+        """Move ticker's watermark forward past trades (list of dicts)."""
+        if not trades:
+            return
+        newest = pd.to_datetime([trade['created_time'] for trade in trades], utc=True, format='ISO8601').max()
+        if ticker not in self.tickers or newest > self.tickers[ticker]:
+            self.tickers[ticker] = newest
+
+    def save(self):
+        """Write the cache, stamped with the archive's current size and mtime."""
+        if not os.path.exists(self.archive_filename):
+            return
+        cache = {
+            'archive': self.archive_stamp(),
+            'tickers': {
+                ticker: {'created_time': latest.isoformat()}
+                for ticker, latest in self.tickers.items()
+            },
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.path)
@@ -65,8 +65,7 @@ Run on Macbook M1 in Conda Spyder environment.
 # Loads required libraries
 import os
 import sys
-import time
-import pandas as pd
+import asyncio
 from dotenv import load_dotenv
 from cryptography.hazmat.primitives import serialization
 
@@ -75,7 +74,14 @@ os.chdir('/Users/jaredkatz/Documents/Research/PredictionMarketsPublic')
 sys.path.append('code/kalshi_scraping')
 
 # import the file that lets us connect to the Kalshi API client
-from clients_kalshi import KalshiHttpClient, KalshiWebSocketClient, Environment
+from clients_kalshi import KalshiHttpClient, KalshiAsyncHttpClient, KalshiWebSocketClient, Environment
+from async_scraping import fetch_tickers_trades
+from trade_buffer import TradePageBuffer
+from trade_watermarks import TradeWatermarks
+from trade_archive import append_to_archive
+from trade_index import TradeIdIndex
+from trade_store import TradeStore, partition_key
+from trade_updates import update_trades
 
 
 ##################################
@@ -140,55 +146,89 @@ import tickers # see some example tickers
 ##################################
 
 """
-# load a csv with our current Kalshi data and a list of tickers that you want to update.
-# pull those tickers, add it to the csv, and then get just distinct rows.
+# pull the list of tickers that you want to update and append any trades we
+# don't already have to the bottom of the csv with our current Kalshi data.
+# Trades are deduplicated on trade_id as each page arrives, against an index
+# of the ids already archived (see trade_index), so the archive itself is
+# never re-read or rewritten.
+#
+# With incremental=True, we also keep a high-watermark of created_time for
+# each ticker (see trade_watermarks) and ask the API only for trades since
+# then with min_ts, so a daily refresh costs a few requests per ticker.
 
 
 Inputs:
         - trade_data: location the csv for trade data is stored
         - tickers: the list of tickers you want to update
+        - incremental: only fetch trades newer than the archive's latest
 """
-def update_kalshi(output_filename, tickers):
+def update_kalshi(output_filename, tickers, incremental=False):
 
-    results = pd.read_csv(output_filename)
-    
-    
-    for ticker in tickers:
-        
-        print(f"Fetching: {ticker}")
-        
-        # get the trades on the first page, append to df and hold the cursor
-        trades = client.get_trades(ticker=ticker)
-        page_df = pd.DataFrame(trades['trades'])
-        print(f"First page rows: {len(page_df)}")
-        
-        results = pd.concat([results, page_df], ignore_index=True)
-        cursor = trades.get('cursor')
-    
-        page = 1
-        
-        # for each page, get the trades and append to our df, get the new cursor
-        # when we hit the end, cursor will turn null and we'll exit the loop
-        while cursor:
-            
-            print(f"  Page {page} cursor: {cursor}")
-            trades = client.get_trades(ticker=ticker, cursor=cursor)
-            page_df = pd.DataFrame(trades['trades'])
-            
-            print(f"  Page {page} rows: {len(page_df)}")
-            results = pd.concat([results, page_df], ignore_index=True)
-            
-            cursor = trades.get('cursor')
-            page += 1
-    
-        time.sleep(1) # pause for a second after each market to avoid rate limits
-        
-        
-    # Save the csv to output_filename after removing dupes
-    results = results.drop_duplicates()
-    results.reset_index(drop=True, inplace=True)
-    
-    results.to_csv(output_filename)
+    # the work is done in trade_updates, so other programs can run it too
+    update_trades(client, output_filename, tickers, incremental=incremental)
+
+
+"""
+# Same as update_kalshi, but walks up to max_concurrency tickers' cursor
+# chains at once with the asyncio client.
+
+Inputs:
+        - output_filename: location the csv for trade data is stored
+        - tickers: the list of tickers you want to update
+        - max_concurrency: how many tickers are fetched at the same time
+        - incremental: only fetch trades newer than the archive's latest
+"""
+def update_kalshi_async(output_filename, tickers, max_concurrency=8, incremental=False):
+
+    index = TradeIdIndex(output_filename)
+    first_index = index.rows
+    ticker_filters = None
+    if incremental:
+        watermarks = TradeWatermarks(output_filename)
+        ticker_filters = {ticker: {'min_ts': watermarks.min_ts(ticker)} for ticker in tickers}
+
+    async def fetch():
+        async with KalshiAsyncHttpClient(key_id=KEYID, private_key=private_key,
+                                         environment=env) as async_client:
+            return await fetch_tickers_trades(async_client, tickers, max_concurrency,
+                                              ticker_filters=ticker_filters)
+
+    trades_by_ticker = asyncio.run(fetch())
+
+    new_trades = TradePageBuffer()
+    for ticker, trades in trades_by_ticker.items():
+        trades = index.filter_new(trades)
+        if incremental:
+            watermarks.advance(ticker, trades)
+        new_trades.append_page(trades)
+
+    # Append the new trades to output_filename and save the updated index
+    append_to_archive(output_filename, new_trades.to_frame(), first_index)
+    index.save()
+    if incremental:
+        watermarks.save()
+
+
+"""
+# Same as update_kalshi, but for a partitioned trade store (see trade_store).
+# Tickers are grouped by contract preamble and each group is updated into
+# its own partition, so only the live contracts' files are read or rewritten.
+# The store's manifest is refreshed for the partitions that were touched.
+
+Inputs:
+        - store_root: directory of the trade store, e.g. data/trade_store
+        - tickers: the list of tickers you want to update
+        - incremental: only fetch trades newer than each partition's latest
+"""
+def update_kalshi_store(store_root, tickers, incremental=False):
+
+    store = TradeStore(store_root)
+
+    for filename, partition_tickers in store.filenames_for_tickers(tickers).items():
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        update_kalshi(filename, partition_tickers, incremental=incremental)
+
+    store.refresh({partition_key(ticker)[1] for ticker in tickers})
 
 
 ##################################
@@ -225,7 +265,13 @@ levels_tickers_update = [
     ]
 
 
-update_kalshi('data/trade_level_data/trade_level_data_fed_levels.csv', levels_tickers_update)
+update_kalshi('data/trade_level_data/trade_level_data_fed_levels.csv', levels_tickers_update, incremental=True)
+
+# or, into the partitioned trade store built by trade_store.py:
+# update_kalshi_store('data/trade_store', levels_tickers_update, incremental=True)
+
+# or, fetching many tickers at once:
+# update_kalshi_async('data/trade_level_data/trade_level_data_fed_levels.csv', levels_tickers_update)
 
 # decisions_tickers = tickers.get_tickers('fed_decisions')
 # scrape_kalshi('data/trade_level_data/trade_level_data_fed_decisions.csv', decisions_tickers)
@@ -249,3 +295,6 @@ update_kalshi('data/trade_level_data/trade_level_data_fed_levels.csv', levels_ti
 # scrape_kalshi('data/trade_level_data/trade_level_data_recession_annual.csv', recession_annual_tickers)
 
 
+
+# Close the pooled HTTP session once all scrapes are done
+client.close()
@@ -0,0 +1,208 @@
+#!/usr/bin/python
+
+"""
+This file runs the data pipeline for several series at once.
+
+Each series goes through up to three stages, each depending on the one
+before it:
+
+    scrape          append new Kalshi trades to the series' trade archive
+                    (trade_updates.update_trades, incremental)
+    distributions   bring data/daily_distribution_data up to date
+                    (distribution_updates.update_series, or rebuild_series
+                    with --full)
+    moments         rewrite data/daily_moments_data
+                    (moments_engine.build_moments)
+
+The series are independent of each other, so the stages form a DAG of
+separate chains. Every stage whose dependencies have finished is handed
+to a pool of worker processes, so a nightly run keeps all cores busy
+instead of working through the series one after another. At most
+--scrape-workers scrapes run at the same time. The scrape workers share
+the API key's rate limit through a file-backed KalshiRateLimiter (see
+kalshi_scraping/rate_limiter) in --rate-state-dir, or in a temporary
+directory for the run if none is given; pass the state_dir of any other
+scraper using the same key to share the budget with it too. If a stage
+fails, the stages that depend on it are skipped and the other series
+carry on.
+
+Each stage is timed in its worker, and a table of the stages is printed at
+the end.
+
+Usage:
+------
+Run from the root of the repo:
+
+    python code/pipeline/run_pipeline.py [series ...] [--stages scrape distributions moments]
+                                         [--workers N] [--scrape-workers N] [--rate-state-dir DIR] [--full]
+
+The default series are those of distribution_engine.SERIES, the default
+stages distributions and moments, and the default number of workers one
+per CPU. Scraping needs the Kalshi credentials described in
+kalshi_scraping/example.env.
+
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'kalshi_scraping'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'convert_trades_to_pdfs'))
+
+from distribution_engine import SERIES, TRADE_DIR
+from moments_engine import MOMENT_FILES
+
+
+STAGES = ['scrape', 'distributions', 'moments']
+DEFAULT_STAGES = ['distributions', 'moments']
+
+StageResult = namedtuple('StageResult', ['series', 'stage', 'status', 'started', 'seconds', 'detail'])
+
+
+def pipeline_graph(names, stages):
+    """
+    The stages to run, as {(series, stage): [(series, stage) it depends
+    on]}. Series without trades (e.g. kalshi_ffr) only have moments.
+    """
+    graph = {}
+    for name in names:
+        previous = None
+        for stage in STAGES:
+            if stage not in stages or (stage != 'moments' and name not in SERIES):
+                continue
+            graph[(name, stage)] = [previous] if previous else []
+            previous = (name, stage)
+    return graph
+
+
+def run_stage(name, stage, full=False, env_file='env.env', rate_state_dir=None):
+    """
+    Run one stage of one series. Called in a worker process. Scrapes take
+    their rate limit from the bucket files in rate_state_dir.
+    """
+    started = time.time()
+    start = time.perf_counter()
+
+    if stage == 'scrape':
+        import tickers
+        from rate_limiter import KalshiRateLimiter
+        from trade_updates import connect, update_trades
+
+        client = connect(env_file, rate_limiter=KalshiRateLimiter(state_dir=rate_state_dir))
+        try:
+            rows = update_trades(client, os.path.join(TRADE_DIR, SERIES[name].trades),
+                                 tickers.get_tickers(name), incremental=True)
+        finally:
+            client.close()
+        detail = f'{rows} new trades'
+
+    elif stage == 'distributions':
+        from distribution_updates import rebuild_series, update_series
+
+        summary = rebuild_series(name) if full else update_series(name)
+        how = 'rebuilt' if summary['full'] else 'updated'
+        detail = f"{how}, {summary['contracts']} contracts, {summary['rows']} rows"
+
+    else:
+        from moments_engine import build_moments
+
+        detail = f'{len(build_moments(name))} rows'
+
+    return StageResult(name, stage, 'done', started, time.perf_counter() - start, detail)
+
+
+def run_pipeline(names, stages=DEFAULT_STAGES, workers=None, scrape_workers=1, full=False, env_file='env.env',
+                 rate_state_dir=None):
+    """
+    Run the given stages of the given series on a pool of worker processes
+    and return a StageResult per stage, in the order they started. The
+    scrapes share one rate limit, kept in rate_state_dir (a temporary
+    directory if None).
+    """
+    if rate_state_dir is None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            return run_pipeline(names, stages, workers, scrape_workers, full, env_file, tmp_dir)
+
+    graph = pipeline_graph(names, stages)
+    waiting = dict(graph)
+    running = {}
+    results = {}
+
+    def ready(key):
+        return all(dependency in results and results[dependency].status == 'done' for dependency in waiting[key])
+
+    def blocked(key):
+        return any(dependency in results and results[dependency].status != 'done' for dependency in waiting[key])
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while waiting or running:
+            # skip the stages whose dependencies failed, submit those that are ready
+            for key in [key for key in waiting if blocked(key)]:
+                results[key] = StageResult(*key, 'skipped', time.time(), 0.0, 'an earlier stage failed')
+                del waiting[key]
+            scraping = sum(stage == 'scrape' for _, stage in running.values())
+            for key in [key for key in waiting if ready(key)]:
+                if key[1] == 'scrape':
+                    if scraping >= max(scrape_workers, 1):
+                        continue
+                    scraping += 1
+                running[pool.submit(run_stage, *key, full=full, env_file=env_file,
+                                    rate_state_dir=rate_state_dir)] = key
+                del waiting[key]
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    results[key] = StageResult(*key, 'failed', time.time(), 0.0, f'{type(e).__name__}: {e}')
+                print(f"{key[0]:<26} {key[1]:<14} {results[key].status:<8} {results[key].seconds:7.2f}s  "
+                      f"{results[key].detail}", flush=True)
+
+    return sorted(results.values(), key=lambda result: result.started)
+
+
+def print_timings(results, wall_seconds):
+    """A table of stage timings: per stage, and the total against the wall-clock time."""
+    print(f"\n{'series':<26} {'stage':<14} {'status':<8} {'start s':>8} {'stage s':>8}")
+    first = min((result.started for result in results), default=0)
+    for result in results:
+        print(f"{result.series:<26} {result.stage:<14} {result.status:<8} "
+              f"{result.started - first:8.2f} {result.seconds:8.2f}")
+    for stage in STAGES:
+        seconds = [result.seconds for result in results if result.stage == stage and result.status == 'done']
+        if seconds:
+            print(f"{'all series':<26} {stage:<14} {'':<8} {'':>8} {sum(seconds):8.2f}")
+    busy = sum(result.seconds for result in results)
+    print(f"stage time {busy:.2f}s in {wall_seconds:.2f}s wall clock ({busy / max(wall_seconds, 1e-9):.1f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run scrape -> distributions -> moments for several series in parallel.')
+    parser.add_argument('series', nargs='*', default=list(SERIES), help=f'default: {" ".join(SERIES)}')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=DEFAULT_STAGES)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--scrape-workers', type=int, default=1, help='scrapes running at the same time')
+    parser.add_argument('--full', action='store_true', help='rebuild distributions from every trade')
+    parser.add_argument('--rate-state-dir', help='directory of the rate limit files shared by the scrapes '
+                                                   '(default: a temporary directory for this run)')
+    parser.add_argument('--env-file', default='env.env')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.series if name not in MOMENT_FILES]
+    if unknown:
+        parser.error(f'unknown series: {" ".join(unknown)}')
+
+    start = time.perf_counter()
+    results = run_pipeline(args.series, args.stages, args.workers, args.scrape_workers, args.full, args.env_file,
+                           args.rate_state_dir)
+    print_timings(results, time.perf_counter() - start)
+    sys.exit(1 if any(result.status == 'failed' for result in results) else 0)